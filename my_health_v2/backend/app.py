@@ -1,4 +1,5 @@
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider, JSONProvider
 from flask_cors import CORS
 from datetime import datetime
 import json
@@ -6,67 +7,312 @@ import os
 from pymongo import MongoClient
 from bson import ObjectId
 import nltk
-from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
 import re
 import pickle
+import threading
+import atexit
+import time
+from queue import Queue, Empty
+
+import numpy as np
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from cachetools import TTLCache
+except ImportError:
+    TTLCache = None
 
 # Import des modules
 import sys
 sys.path.append('models')
-from disease_predictor import DiseasePredictor
-from conversational_agent import ConversationalAgent
-from predictive_health_analyzer import PredictiveHealthAnalyzer
+# Les modules ML / conversationnels (sklearn, openai) sont importés à la
+# première utilisation, voir _Lazy plus bas
 
 # Télécharger les ressources NLTK nécessaires
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
 try:
     nltk.data.find('corpora/stopwords')
 except LookupError:
     nltk.download('stopwords')
 
+class MongoJSONProvider(DefaultJSONProvider):
+    """Sérialise directement les ObjectId et datetime des documents MongoDB"""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+class OrjsonProvider(JSONProvider):
+    """Sérialisation orjson (C) : datetime et tableaux NumPy natifs, ObjectId
+    via default. jsonify écrit directement les octets produits par orjson."""
+    
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson is not None else 0
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        return DefaultJSONProvider.default(o)
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.options).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.options),
+            mimetype='application/json'
+        )
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app) if orjson is not None else MongoJSONProvider(app)
 CORS(app)
 
+@app.before_request
+def _warm_up_modules():
+    # before_first_request n'existe plus depuis Flask 2.3
+    start_preload()
+
 # Configuration MongoDB
 MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
-try:
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000)
-    client.server_info()
-    db = client['medical_chatbot']
-    users_collection = db['users']
-    consultations_collection = db['consultations']
-    conversations_collection = db['conversations']
-    predictions_collection = db['predictions']
-    mongo_available = True
-    print("MongoDB connecté avec succès")
-except Exception as e:
-    print(f"MongoDB non disponible: {e}")
-    mongo_available = False
 
-# Initialiser les modules
-predictor = DiseasePredictor()
-try:
-    if os.path.exists('models/disease_model.pkl'):
-        predictor.load_model()
-        print("Modèle ML chargé depuis le fichier")
-    else:
-        print("Modèle ML non trouvé. Entraînement en cours...")
+# Pool de connexions (un seul MongoClient par processus, jamais par requête).
+# Connexions ouvertes côté serveur ~ (minPoolSize + 2) x membres du replica set
+# x processus (gunicorn --workers), soit ~1 Mo de RAM MongoDB par connexion.
+# maxPoolSize doit rester >= au nombre de threads par worker (gunicorn --threads).
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '50'))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', '5'))
+
+# Rétention optionnelle des conversations (en jours, via index TTL)
+CONVERSATION_TTL_DAYS = os.getenv('CONVERSATION_TTL_DAYS')
+
+def _create_indexes():
+    # Les historiques font tous find({'user_id'}).sort('timestamp', -1).limit(N) :
+    # l'index composé évite le scan de collection et le tri en mémoire (IXSCAN)
+    try:
+        for collection in (conversations_collection, consultations_collection, predictions_collection):
+            collection.create_index([('user_id', 1), ('timestamp', -1)], background=True)
+        if CONVERSATION_TTL_DAYS:
+            conversations_collection.create_index(
+                'timestamp',
+                expireAfterSeconds=int(CONVERSATION_TTL_DAYS) * 86400,
+                background=True
+            )
+    except Exception as e:
+        print(f"WARNING: Création des index MongoDB impossible: {e}")
+
+# Écritures MongoDB différées : un thread regroupe les documents en insert_many
+# pour sortir l'aller-retour réseau du chemin critique de /api/chat
+WRITE_BATCH_SIZE = 100
+WRITE_FLUSH_INTERVAL = 0.2  # secondes
+_write_queue = Queue()
+_write_thread = None
+
+def _write_batch(batch):
+    """Insère un lot de (collection, document) groupé par collection"""
+    by_collection = {}
+    for collection, document in batch:
+        by_collection.setdefault(collection.name, (collection, []))[1].append(document)
+    
+    for collection, documents in by_collection.values():
+        try:
+            collection.insert_many(documents, ordered=False)
+        except Exception as e:
+            print(f"WARNING: Erreur écriture MongoDB différée: {e}")
+
+def _write_worker():
+    """Vide la file par lots de WRITE_BATCH_SIZE ou toutes les WRITE_FLUSH_INTERVAL s"""
+    running = True
+    while running:
+        item = _write_queue.get()
+        if item is None:
+            break
+        batch = [item]
+        deadline = time.monotonic() + WRITE_FLUSH_INTERVAL
+        while len(batch) < WRITE_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = _write_queue.get(timeout=remaining)
+            except Empty:
+                break
+            if item is None:
+                running = False
+                break
+            batch.append(item)
+        _write_batch(batch)
+    
+    # Arrêt : écrire ce qui reste dans la file
+    remaining_items = []
+    while True:
+        try:
+            item = _write_queue.get_nowait()
+        except Empty:
+            break
+        if item is not None:
+            remaining_items.append(item)
+    if remaining_items:
+        _write_batch(remaining_items)
+
+def queue_write(collection, document):
+    """Programme l'insertion d'un document sans attendre MongoDB"""
+    _write_queue.put((collection, document))
+
+def _flush_writes():
+    if _write_thread is None:
+        return
+    _write_queue.put(None)
+    _write_thread.join(timeout=5)
+
+atexit.register(_flush_writes)
+
+def init_mongo(create_indexes=True):
+    """Ouvre le client MongoDB du processus courant et démarre son thread
+    d'écriture. Ni les sockets du pool ni les threads ne survivent à un
+    fork : à rappeler dans chaque worker si l'app est préchargée
+    (voir gunicorn.conf.py)"""
+    global client, db, users_collection, consultations_collection
+    global conversations_collection, predictions_collection, mongo_available
+    global _write_queue, _write_thread
+    
+    try:
+        client = MongoClient(
+            MONGO_URI,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=30000,
+            waitQueueTimeoutMS=2500,
+            serverSelectionTimeoutMS=2000,
+            retryWrites=True
+        )
+        client.server_info()
+        db = client['medical_chatbot']
+        users_collection = db['users']
+        consultations_collection = db['consultations']
+        conversations_collection = db['conversations']
+        predictions_collection = db['predictions']
+        mongo_available = True
+        print("MongoDB connecté avec succès")
+    except Exception as e:
+        print(f"MongoDB non disponible: {e}")
+        mongo_available = False
+    
+    _write_queue = Queue()
+    _write_thread = None
+    if mongo_available:
+        if create_indexes:
+            _create_indexes()
+        _write_thread = threading.Thread(target=_write_worker, daemon=True)
+        _write_thread.start()
+
+init_mongo()
+
+# Initialisation différée des modules lourds : chaque worker démarre sans
+# charger sklearn/OpenAI, le chargement a lieu au premier usage ou en
+# arrière-plan dès la première requête
+class _Lazy:
+    """Singleton initialisé à la demande, sûr en multi-thread"""
+    
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._instance = None
+    
+    @property
+    def is_loaded(self):
+        return self._instance is not None
+    
+    def get(self):
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                instance = self._instance
+        return instance
+    
+    def replace(self, instance):
+        """Substitue instance au singleton (modèle réentraîné)"""
+        with self._lock:
+            self._instance = instance
+    
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+def _load_predictor():
+    from disease_predictor import DiseasePredictor
+    
+    predictor = DiseasePredictor()
+    try:
+        if os.path.exists('models/disease_model.pkl'):
+            predictor.load_model()
+            print("Modèle ML chargé depuis le fichier")
+        else:
+            print("Modèle ML non trouvé. Entraînement en cours...")
+            predictor.train()
+            os.makedirs('models', exist_ok=True)
+            predictor.save_model()
+            print("Modèle ML entraîné et sauvegardé")
+    except Exception as e:
+        print(f"Erreur ML: {e}")
         predictor.train()
-        os.makedirs('models', exist_ok=True)
         predictor.save_model()
-        print("Modèle ML entraîné et sauvegardé")
-except Exception as e:
-    print(f"Erreur ML: {e}")
-    predictor.train()
-    predictor.save_model()
+    return predictor
+
+def _load_conversational_agent():
+    from conversational_agent import ConversationalAgent
+    return ConversationalAgent()
+
+def _load_predictive_analyzer():
+    from predictive_health_analyzer import PredictiveHealthAnalyzer
+    return PredictiveHealthAnalyzer()
+
+# Initialiser les modules
+predictor = _Lazy(_load_predictor)
+conversational_agent = _Lazy(_load_conversational_agent)
+predictive_analyzer = _Lazy(_load_predictive_analyzer)
+LAZY_MODULES = (predictor, conversational_agent, predictive_analyzer)
+
+_preload_lock = threading.Lock()
+_preload_started = False
+
+def _preload_modules():
+    for module in LAZY_MODULES:
+        try:
+            module.get()
+        except Exception as e:
+            print(f"Erreur chargement différé: {e}")
 
-# Initialiser l'agent conversationnel et le prédicteur de santé
-conversational_agent = ConversationalAgent()
-predictive_analyzer = PredictiveHealthAnalyzer()
+def start_preload():
+    """Lance une seule fois le préchargement des modules en arrière-plan"""
+    global _preload_started
+    if _preload_started:
+        return
+    with _preload_lock:
+        if _preload_started:
+            return
+        _preload_started = True
+    threading.Thread(target=_preload_modules, daemon=True).start()
+
+def modules_ready():
+    return all(module.is_loaded for module in LAZY_MODULES)
 
 # Base de connaissances médicales
 MEDICAL_KNOWLEDGE = {
@@ -211,47 +457,183 @@ EMERGENCY_SYMPTOMS = [
     "trouble de la parole", "perte de sensibilité", "crise cardiaque",
     "avc", "accident vasculaire", "saignement abondant", "essoufflement sévère"
 ]
+# Dédoublonnées, les plus longues (plus spécifiques) en premier : l'alternance
+# essaie "paralysie faciale" avant son préfixe "paralysie"
+EMERGENCY_SYMPTOMS = tuple(sorted(set(EMERGENCY_SYMPTOMS), key=lambda s: (-len(s), s)))
+
+# Une seule alternance compilée au lieu de 17 recherches de sous-chaînes
+EMERGENCY_RE = re.compile(
+    r'(?:' + '|'.join(re.escape(s) for s in EMERGENCY_SYMPTOMS) + r')'
+)
+
+# Tokenisation en une passe : remplace re.sub + word_tokenize (Punkt)
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+class NormalizedMessage:
+    """Message utilisateur prétraité une seule fois par requête et partagé
+    par la détection d'urgence, l'extraction de symptômes et le ML"""
+    __slots__ = ('raw', 'lower', 'tokens', 'token_set')
+    
+    def __init__(self, raw, lower, tokens):
+        self.raw = raw
+        self.lower = lower
+        self.tokens = tokens
+        self.token_set = frozenset(tokens)
 
 class SymptomAnalyzer:
     def __init__(self):
         try:
-            self.stop_words = set(stopwords.words('french'))
+            self.stop_words = frozenset(stopwords.words('french'))
         except:
             print("WARNING: Stopwords français non disponibles")
-            self.stop_words = set()
+            self.stop_words = frozenset()
     
     def preprocess_text(self, text):
-        text = text.lower()
-        text = re.sub(r'[^\w\s]', '', text)
-        try:
-            tokens = word_tokenize(text, language='french')
-        except:
-            tokens = text.split()
-        tokens = [t for t in tokens if t not in self.stop_words]
-        return tokens
+        tokens = _TOKEN_RE.findall(text.lower())
+        return [t for t in tokens if t not in self.stop_words]
+    
+    def normalize(self, text):
+        """Minuscules + tokens du message, calculés une fois pour toute la requête"""
+        lower = text.lower()
+        tokens = [t for t in _TOKEN_RE.findall(lower) if t not in self.stop_words]
+        return NormalizedMessage(text, lower, tokens)
+    
+    def extract_symptoms(self, message):
+        """Attend un NormalizedMessage"""
+        if SYMPTOM_AUTOMATON is None:
+            return self._extract_symptoms_by_tokens(message.token_set)
+        
+        # Un seul passage sur le message au lieu de re-tokeniser chaque symptôme
+        text = message.lower
+        detected_symptoms = set()
+        
+        for end, (token, symptoms) in SYMPTOM_AUTOMATON.iter(text):
+            start = end - len(token) + 1
+            # Ne garder que les mots entiers, comme avec la tokenisation
+            if start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if end + 1 < len(text) and _is_word_char(text[end + 1]):
+                continue
+            detected_symptoms.update(symptoms)
+        
+        return list(detected_symptoms)
     
-    def extract_symptoms(self, text):
-        tokens = self.preprocess_text(text)
-        detected_symptoms = []
+    def _extract_symptoms_by_tokens(self, tokens):
+        """Extraction par intersection avec les tokens précalculés"""
+        detected_symptoms = set()
         
-        for disease, info in MEDICAL_KNOWLEDGE.items():
-            for symptom in info['symptoms']:
-                symptom_tokens = self.preprocess_text(symptom)
-                if any(token in tokens for token in symptom_tokens):
-                    detected_symptoms.append(symptom)
+        for info in MEDICAL_KNOWLEDGE.values():
+            if not tokens & info['all_symptom_tokens']:
+                continue
+            for symptom, symptom_tokens in zip(info['symptoms'], info['symptom_tokens']):
+                if tokens & symptom_tokens:
+                    detected_symptoms.add(symptom)
         
-        return list(set(detected_symptoms))
+        return list(detected_symptoms)
     
-    def check_emergency(self, text):
-        text_lower = text.lower()
-        for emergency in EMERGENCY_SYMPTOMS:
-            if emergency in text_lower:
-                return True
-        return False
+    def check_emergency(self, message):
+        """Attend un NormalizedMessage"""
+        return EMERGENCY_RE.search(message.lower) is not None
 
 analyzer = SymptomAnalyzer()
 
-def save_conversation(user_id, message, response, intent):
+# La base de connaissances est statique : tokens des symptômes calculés une fois
+for _info in MEDICAL_KNOWLEDGE.values():
+    _info['symptom_tokens'] = [
+        frozenset(analyzer.preprocess_text(symptom)) for symptom in _info['symptoms']
+    ]
+    _info['all_symptom_tokens'] = frozenset().union(*_info['symptom_tokens'])
+
+# Moteur d'extraction des symptômes : auto (pyahocorasick si installé, sinon
+# tokens), ahocorasick ou tokens (intersection d'ensembles)
+SYMPTOM_MATCHER = os.getenv('SYMPTOM_MATCHER', 'auto').lower()
+
+def _symptoms_by_token():
+    """Chaque mot-clé renvoie vers tous les symptômes qui le contiennent"""
+    symptoms_by_token = {}
+    for info in MEDICAL_KNOWLEDGE.values():
+        for symptom, symptom_tokens in zip(info['symptoms'], info['symptom_tokens']):
+            for token in symptom_tokens:
+                symptoms_by_token.setdefault(token, set()).add(symptom)
+    return {token: tuple(symptoms) for token, symptoms in symptoms_by_token.items()}
+
+def _build_symptom_automaton():
+    """Construit une fois pour toutes l'automate des mots-clés de symptômes"""
+    if SYMPTOM_MATCHER not in ('auto', 'ahocorasick'):
+        return None
+    if ahocorasick is None:
+        print("WARNING: pyahocorasick non disponible, extraction token par token")
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for token, symptoms in _symptoms_by_token().items():
+        automaton.add_word(token, (token, symptoms))
+    automaton.make_automaton()
+    return automaton
+
+SYMPTOM_AUTOMATON = _build_symptom_automaton()
+
+# Matrice maladies x symptômes pour calculer toutes les confiances en un
+# seul produit matrice-vecteur
+DISEASE_NAMES = list(MEDICAL_KNOWLEDGE)
+SYMPTOM_INDEX = {}
+for _info in MEDICAL_KNOWLEDGE.values():
+    for _symptom in _info['symptoms']:
+        SYMPTOM_INDEX.setdefault(_symptom, len(SYMPTOM_INDEX))
+
+DISEASE_SYMPTOM_MATRIX = np.zeros((len(DISEASE_NAMES), len(SYMPTOM_INDEX)), dtype=np.int8)
+for _row, _disease in enumerate(DISEASE_NAMES):
+    DISEASE_SYMPTOM_MATRIX[_row, [SYMPTOM_INDEX[s] for s in MEDICAL_KNOWLEDGE[_disease]['symptoms']]] = 1
+# Dénominateur = nombre de symptômes listés, comme len(info['symptoms'])
+DISEASE_SYMPTOM_COUNTS = np.array(
+    [len(MEDICAL_KNOWLEDGE[d]['symptoms']) for d in DISEASE_NAMES], dtype=np.float64
+)
+
+def score_diseases(detected_symptoms):
+    """Retourne [(maladie, nb de symptômes communs, confiance %)] pour les
+    maladies ayant au moins un symptôme détecté"""
+    v = np.zeros(len(SYMPTOM_INDEX), dtype=np.int8)
+    v[[SYMPTOM_INDEX[s] for s in detected_symptoms if s in SYMPTOM_INDEX]] = 1
+    matches = DISEASE_SYMPTOM_MATRIX @ v
+    confidences = matches / DISEASE_SYMPTOM_COUNTS * 100
+    rows = np.flatnonzero(matches)
+    return [(DISEASE_NAMES[i], int(matches[i]), float(confidences[i])) for i in rows]
+
+# Réponses conversationnelles récentes par (user_id, message) : un renvoi du
+# même message (double clic, retry du frontend) ne rappelle pas l'API de
+# l'agent. TTLCache plutôt qu'un simple LRU : la réponse dépend de
+# l'historique, un "oui" répété plus tard ne doit pas rejouer l'ancienne.
+# Le tour est tout de même enregistré (historique de l'agent, MongoDB).
+CONVERSATION_CACHE_SIZE = 1024
+CONVERSATION_CACHE_TTL = 60  # secondes
+_conversation_cache = (
+    TTLCache(maxsize=CONVERSATION_CACHE_SIZE, ttl=CONVERSATION_CACHE_TTL)
+    if TTLCache is not None else None
+)
+_conversation_cache_lock = threading.Lock()
+
+def get_cached_reply(key):
+    if _conversation_cache is None:
+        return None
+    with _conversation_cache_lock:
+        return _conversation_cache.get(key)
+
+def cache_reply(key, payload):
+    if _conversation_cache is None:
+        return
+    with _conversation_cache_lock:
+        _conversation_cache[key] = payload
+
+def clear_reply_cache():
+    if _conversation_cache is None:
+        return
+    with _conversation_cache_lock:
+        _conversation_cache.clear()
+
+def save_conversation(user_id, message, response, intent, sync=False):
     if mongo_available:
         try:
             conversation = {
@@ -261,7 +643,10 @@ def save_conversation(user_id, message, response, intent):
                 'intent': intent,
                 'timestamp': datetime.now()
             }
-            conversations_collection.insert_one(conversation)
+            if sync:
+                conversations_collection.insert_one(conversation)
+            else:
+                queue_write(conversations_collection, conversation)
         except Exception as e:
             print(f"WARNING: Erreur sauvegarde conversation: {e}")
 
@@ -272,11 +657,12 @@ def chat():
         data = request.json
         user_message = data.get('message', '')
         user_id = data.get('user_id', 'anonymous')
+        normalized = analyzer.normalize(user_message)
         
         print(f"Chat request from user {user_id}: {user_message}")
         
         # Vérifier les urgences
-        is_emergency = analyzer.check_emergency(user_message)
+        is_emergency = analyzer.check_emergency(normalized)
         if is_emergency:
             emergency_response = {
                 'message': "URGENCE MÉDICALE DÉTECTÉE\n\n"
@@ -289,7 +675,8 @@ def chat():
                 'severity': 'critique'
             }
             
-            save_conversation(user_id, user_message, emergency_response['message'], 'emergency')
+            # Les urgences sont écrites de façon synchrone (durables avant la réponse)
+            save_conversation(user_id, user_message, emergency_response['message'], 'emergency', sync=True)
             
             if mongo_available:
                 try:
@@ -305,20 +692,35 @@ def chat():
             
             return jsonify(emergency_response)
         
+        # Message identique renvoyé récemment : même réponse, sans appel à
+        # l'API, mais le tour est enregistré comme les autres
+        cache_key = (user_id, user_message)
+        cached = get_cached_reply(cache_key)
+        if cached is not None:
+            conversational_agent.record_turn(user_id, user_message, cached['message'])
+            save_conversation(user_id, user_message, cached['message'], cached['intent'])
+            return jsonify(cached)
+        
         # Gérer la conversation
         conversation_result = conversational_agent.handle_conversation(user_message, user_id)
         
         if conversation_result['needs_analysis']:
-            return perform_symptom_analysis(user_message, user_id, conversation_result)
+            # Jamais mise en cache : dépend de l'état du modèle ML
+            return perform_symptom_analysis(user_message, user_id, conversation_result, normalized)
         else:
             save_conversation(user_id, user_message, conversation_result['response'], conversation_result['intent'])
             
-            return jsonify({
+            payload = {
                 'message': conversation_result['response'],
                 'intent': conversation_result['intent'],
                 'conversational': True,
                 'needs_analysis': False
-            })
+            }
+            # Réponse de secours (API en échec ou absente) : pas de cache, le
+            # prochain envoi retente l'API
+            if not conversation_result['fallback']:
+                cache_reply(cache_key, payload)
+            return jsonify(payload)
         
     except Exception as e:
         print(f"ERROR: {e}")
@@ -326,19 +728,25 @@ def chat():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
-def perform_symptom_analysis(user_message, user_id, conversation_context):
+def perform_symptom_analysis(user_message, user_id, conversation_context, normalized=None):
     """Analyse complète avec diagnostic + prédiction"""
     try:
         # Extraire les symptômes
-        detected_symptoms = analyzer.extract_symptoms(user_message)
+        if normalized is None:
+            normalized = analyzer.normalize(user_message)
+        detected_symptoms = analyzer.extract_symptoms(normalized)
         
-        # Prédiction ML
+        # Prédiction ML, sauf pendant le chargement (ou l'entraînement
+        # initial) du modèle en arrière-plan : la requête n'attend pas
         ml_result = None
-        try:
-            ml_result = predictor.predict(user_message)
-            print(f"ML Prediction: {ml_result['predicted_disease']} ({ml_result['confidence']:.1f}%)")
-        except Exception as e:
-            print(f"WARNING: Erreur ML: {e}")
+        if predictor.is_loaded:
+            try:
+                ml_result = predictor.predict(user_message)
+                print(f"ML Prediction: {ml_result['predicted_disease']} ({ml_result['confidence']:.1f}%)")
+            except Exception as e:
+                print(f"WARNING: Erreur ML: {e}")
+        else:
+            print("Modèle ML en cours de chargement: analyse par règles seule")
         
         if not detected_symptoms and not ml_result:
             no_symptoms_response = conversational_agent.generate_symptom_prompt()
@@ -352,17 +760,15 @@ def perform_symptom_analysis(user_message, user_id, conversation_context):
         
         # Trouver les maladies correspondantes
         possible_diseases = []
-        for disease, info in MEDICAL_KNOWLEDGE.items():
-            matches = sum(1 for s in detected_symptoms if s in info['symptoms'])
-            if matches > 0:
-                confidence = (matches / len(info['symptoms'])) * 100
-                possible_diseases.append({
-                    'disease': disease,
-                    'confidence': round(confidence, 2),
-                    'severity': info['severity'],
-                    'recommendations': info['recommendations'],
-                    'method': 'rules'
-                })
+        for disease, matches, confidence in score_diseases(detected_symptoms):
+            info = MEDICAL_KNOWLEDGE[disease]
+            possible_diseases.append({
+                'disease': disease,
+                'confidence': round(confidence, 2),
+                'severity': info['severity'],
+                'recommendations': info['recommendations'],
+                'method': 'rules'
+            })
         
         # Ajouter prédiction ML
         if ml_result:
@@ -381,6 +787,8 @@ def perform_symptom_analysis(user_message, user_id, conversation_context):
                         'method': 'ml'
                     })
         
+        # Liste complète triée : réponse (possible_diseases) et diagnostic
+        # sauvegardé, affichés en entier par l'historique du frontend
         possible_diseases.sort(key=lambda x: x['confidence'], reverse=True)
         
         # Sauvegarder consultation
@@ -394,8 +802,8 @@ def perform_symptom_analysis(user_message, user_id, conversation_context):
                     'ml_prediction': ml_result,
                     'timestamp': datetime.now()
                 }
-                consultations_collection.insert_one(consultation)
-                print("Consultation sauvegardée")
+                queue_write(consultations_collection, consultation)
+                print("Consultation mise en file de sauvegarde")
             except Exception as e:
                 print(f"WARNING: Erreur MongoDB: {e}")
         
@@ -461,6 +869,26 @@ def perform_symptom_analysis(user_message, user_id, conversation_context):
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+# Projections des requêtes d'historique : seuls les champs réellement lus
+# sont transférés depuis MongoDB (à garder alignées avec leurs consommateurs)
+
+# PredictiveHealthAnalyzer.analyze_consultation_history : symptômes, maladies, date
+ANALYSIS_PROJECTION = {
+    'symptoms': 1, 'diagnosis.disease': 1, 'timestamp': 1
+}
+# Frontend (liste + détail de l'historique) : date, message, symptômes, diagnostics
+HISTORY_PROJECTION = {
+    'message': 1, 'symptoms': 1, 'emergency': 1, 'timestamp': 1,
+    'diagnosis.disease': 1, 'diagnosis.confidence': 1, 'diagnosis.severity': 1
+}
+# Historique des analyses : résultats et niveau de priorité, sans le rapport texte
+PREDICTIONS_PROJECTION = {
+    'predictions': 1, 'next_checkup': 1, 'report.priority_level': 1, 'timestamp': 1
+}
+CONVERSATIONS_PROJECTION = {
+    'message': 1, 'response': 1, 'intent': 1, 'timestamp': 1
+}
+
 @app.route('/api/predict-health', methods=['POST'])
 def predict_health_risks():
     """Analyse prédictive des risques de santé"""
@@ -480,15 +908,9 @@ def predict_health_risks():
         # Récupérer l'historique des consultations
         try:
             consultations = list(consultations_collection.find(
-                {'user_id': user_id}
+                {'user_id': user_id}, ANALYSIS_PROJECTION
             ).sort('timestamp', -1).limit(50))
             
-            # Nettoyer les ObjectId pour JSON
-            for consultation in consultations:
-                consultation['_id'] = str(consultation['_id'])
-                if isinstance(consultation.get('timestamp'), datetime):
-                    consultation['timestamp'] = consultation['timestamp'].isoformat()
-            
         except Exception as e:
             print(f"ERROR: Failed to fetch history: {e}")
             return jsonify({
@@ -499,7 +921,7 @@ def predict_health_risks():
         # Analyse de l'historique
         history_analysis = predictive_analyzer.analyze_consultation_history(consultations)
         
-        if not history_analysis.get('sufficient_data'):
+        if not history_analysis.sufficient_data:
             return jsonify({
                 'has_predictions': False,
                 'message': "DONNÉES INSUFFISANTES\n\n"
@@ -512,8 +934,8 @@ def predict_health_risks():
             })
         
         # Enrichir user_data avec l'analyse
-        user_data['total_consultations'] = history_analysis.get('total_consultations', 0)
-        user_data['avg_frequency'] = history_analysis.get('avg_consultation_frequency', 0)
+        user_data['total_consultations'] = history_analysis.total_consultations
+        user_data['avg_frequency'] = history_analysis.avg_consultation_frequency
         
         # Calculer les risques
         predictions = predictive_analyzer.calculate_disease_risk(user_data, history_analysis)
@@ -529,7 +951,7 @@ def predict_health_risks():
             prediction_record = {
                 'user_id': user_id,
                 'predictions': predictions,
-                'history_analysis': history_analysis,
+                'history_analysis': history_analysis.to_dict(),
                 'user_data': user_data,
                 'report': report,
                 'next_checkup': next_checkup,
@@ -547,9 +969,9 @@ def predict_health_risks():
             'priority_level': report.get('priority_level'),
             'next_checkup': next_checkup,
             'history_summary': {
-                'total_consultations': history_analysis.get('total_consultations'),
-                'recurring_symptoms': history_analysis.get('recurring_symptoms'),
-                'avg_frequency_days': history_analysis.get('avg_consultation_frequency')
+                'total_consultations': history_analysis.total_consultations,
+                'recurring_symptoms': history_analysis.recurring_symptoms,
+                'avg_frequency_days': history_analysis.avg_consultation_frequency
             }
         })
         
@@ -572,13 +994,9 @@ def get_history(user_id):
     
     try:
         consultations = list(consultations_collection.find(
-            {'user_id': user_id}
+            {'user_id': user_id}, HISTORY_PROJECTION
         ).sort('timestamp', -1).limit(10))
         
-        for consultation in consultations:
-            consultation['_id'] = str(consultation['_id'])
-            consultation['timestamp'] = consultation['timestamp'].isoformat()
-        
         return jsonify({'consultations': consultations})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -591,13 +1009,9 @@ def get_predictions_history(user_id):
     
     try:
         predictions = list(predictions_collection.find(
-            {'user_id': user_id}
+            {'user_id': user_id}, PREDICTIONS_PROJECTION
         ).sort('timestamp', -1).limit(5))
         
-        for pred in predictions:
-            pred['_id'] = str(pred['_id'])
-            pred['timestamp'] = pred['timestamp'].isoformat()
-        
         return jsonify({'predictions': predictions})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -610,13 +1024,9 @@ def get_conversations(user_id):
     
     try:
         conversations = list(conversations_collection.find(
-            {'user_id': user_id}
+            {'user_id': user_id}, CONVERSATIONS_PROJECTION
         ).sort('timestamp', -1).limit(50))
         
-        for conv in conversations:
-            conv['_id'] = str(conv['_id'])
-            conv['timestamp'] = conv['timestamp'].isoformat()
-        
         return jsonify({'conversations': conversations})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -624,27 +1034,69 @@ def get_conversations(user_id):
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Endpoint de vérification de santé"""
+    # Ne force pas le chargement : le endpoint reste instantané pendant le
+    # préchargement, 'ready' indique si le worker peut servir les analyses
+    if not predictor.is_loaded:
+        ml_status = 'loading'
+    else:
+        ml_status = 'loaded' if predictor.is_trained else 'not loaded'
     return jsonify({
         'status': 'healthy',
-        'ml_model': 'loaded' if predictor.is_trained else 'not loaded',
+        'ready': modules_ready(),
+        'ml_model': ml_status,
+        'ml_retraining': _retrain_lock.locked(),
         'mongodb': 'connected' if mongo_available else 'disconnected',
-        'conversational_agent': 'active',
-        'predictive_analyzer': 'active',
+        'conversational_agent': 'active' if conversational_agent.is_loaded else 'loading',
+        'predictive_analyzer': 'active' if predictive_analyzer.is_loaded else 'loading',
         'timestamp': datetime.now().isoformat()
     })
 
+# Un seul réentraînement à la fois, tenu par le thread qui le mène
+_retrain_lock = threading.Lock()
+
+def _retrain_predictor():
+    """
+    Réentraîne un nouveau DiseasePredictor, repris du fichier sauvegardé
+    (boosting complété à chaud), puis le substitue au modèle servi : les
+    prédictions en cours ne voient jamais un modèle à moitié entraîné
+    """
+    from disease_predictor import DiseasePredictor
+    
+    try:
+        retrained = DiseasePredictor()
+        if os.path.exists('models/disease_model.pkl'):
+            try:
+                retrained.load_model()
+            except Exception as e:
+                print(f"Erreur ML: {e}")
+                retrained = DiseasePredictor()
+        retrained.train()
+        retrained.save_model()
+        predictor.replace(retrained)
+        clear_reply_cache()
+        print("Modèle ML réentraîné et sauvegardé")
+    except Exception as e:
+        print(f"Erreur réentraînement ML: {e}")
+    finally:
+        _retrain_lock.release()
+
 @app.route('/api/retrain', methods=['POST'])
 def retrain_model():
-    """Réentraîne le modèle ML"""
-    try:
-        predictor.train()
-        predictor.save_model()
+    """Lance le réentraînement du modèle ML en arrière-plan"""
+    if not _retrain_lock.acquire(blocking=False):
         return jsonify({
-            'status': 'success',
-            'message': 'Modèle réentraîné avec succès'
-        })
+            'status': 'training',
+            'message': 'Réentraînement déjà en cours'
+        }), 409
+    try:
+        threading.Thread(target=_retrain_predictor, daemon=True).start()
     except Exception as e:
+        _retrain_lock.release()
         return jsonify({'error': str(e)}), 500
+    return jsonify({
+        'status': 'training',
+        'message': 'Réentraînement lancé en arrière-plan (voir /api/health)'
+    }), 202
 
 if __name__ == '__main__':
     print("\n" + "="*60)
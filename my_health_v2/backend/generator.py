@@ -7,7 +7,15 @@ Crée un CSV avec symptômes et diagnostics
 import pandas as pd
 import numpy as np
 import os
+import random
 from datetime import datetime
+from types import MappingProxyType
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
 
 # Base de connaissances: Maladie -> Symptômes
 DISEASE_SYMPTOMS = {
@@ -61,14 +69,34 @@ DISEASE_SYMPTOMS = {
     },
 }
 
-# Tous les symptômes possibles
-ALL_SYMPTOMS = sorted(list(set([s for disease_info in DISEASE_SYMPTOMS.values() 
-                                 for s in disease_info["symptoms"]])))
+# Tous les symptômes possibles et leur colonne dans les vecteurs 0/1
+ALL_SYMPTOMS = ()
+SYMPTOM_INDEX = {}
+# Vues en lecture seule renvoyées par les getters (pas de copie par appel)
+ALL_DISEASES = ()
+_DISEASE_INFO_VIEWS = {}
+
+
+def _rebuild_symptom_index():
+    """Recalcule ALL_SYMPTOMS, SYMPTOM_INDEX et les vues des getters
+    depuis DISEASE_SYMPTOMS"""
+    global ALL_SYMPTOMS, SYMPTOM_INDEX, ALL_DISEASES, _DISEASE_INFO_VIEWS
+    ALL_SYMPTOMS = tuple(sorted({s for disease_info in DISEASE_SYMPTOMS.values()
+                                 for s in disease_info["symptoms"]}))
+    SYMPTOM_INDEX = {s: i for i, s in enumerate(ALL_SYMPTOMS)}
+    ALL_DISEASES = tuple(DISEASE_SYMPTOMS)
+    _DISEASE_INFO_VIEWS = {name: MappingProxyType(info)
+                           for name, info in DISEASE_SYMPTOMS.items()}
+
+
+_rebuild_symptom_index()
 
 
 def create_symptom_vector(disease_symptoms, all_symptoms):
     """
-    Crée un vecteur de symptômes (0/1) pour l'entraînement ML
+    Crée un vecteur de symptômes (0/1) pour une seule ligne.
+    generate_training_data construit directement la matrice complète ;
+    cette fonction reste pour l'encodage ponctuel d'une ligne.
     
     Args:
         disease_symptoms: liste des symptômes de la maladie
@@ -77,23 +105,58 @@ def create_symptom_vector(disease_symptoms, all_symptoms):
     Returns:
         dict avec symptômes encodés
     """
-    return {symptom: 1 if symptom in disease_symptoms else 0 
+    # Test d'appartenance en O(1) au lieu d'un parcours de liste par symptôme
+    present = (disease_symptoms if isinstance(disease_symptoms, (set, frozenset))
+               else frozenset(disease_symptoms))
+    return {symptom: 1 if symptom in present else 0 
             for symptom in all_symptoms}
 
 
-def generate_training_data(output_file='data/training_data.csv', variations=True):
+def generate_training_data(output_file='data/training_data.csv', variations=True, verbose=False,
+                           seed=None, output_format='csv'):
     """
     Génère le dataset d'entraînement
     
     Args:
         output_file: chemin du fichier CSV à créer
         variations: si True, crée des variations (cas léger, cas grave, etc.)
+        verbose: si True, affiche chaque maladie traitée
+        seed: graine du tirage du symptôme supplémentaire (cas grave)
+        output_format: 'csv' ou 'parquet' (colonnes booléennes, 1 bit par
+            cellule, nécessite pyarrow)
         
     Returns:
         pandas DataFrame
+    
+    Raises:
+        ValueError: format inconnu
+        ImportError: 'parquet' demandé sans pyarrow
     """
+    # Vérifié avant la génération : un .parquet demandé ne doit pas devenir
+    # silencieusement un .csv, que load_training_data ne retrouverait jamais
+    if output_format not in ('csv', 'parquet'):
+        raise ValueError(f"Format inconnu: {output_format} (attendu: 'csv' ou 'parquet')")
+    if output_format == 'parquet' and pa is None:
+        raise ImportError("pyarrow est nécessaire pour l'export Parquet (pip install pyarrow)")
     
-    rows = []
+    # Au plus 4 cas par maladie : libellés préalloués, remplis par index ;
+    # les colonnes à 1 de chaque ligne sont accumulées à plat (format CSR)
+    # puis la matrice est remplie en une seule affectation NumPy
+    max_rows = 4 * len(DISEASE_SYMPTOMS)
+    diseases = np.empty(max_rows, dtype=object)
+    severities = np.empty(max_rows, dtype=object)
+    col_idx = []
+    row_starts = [0]
+    n_rows = 0
+    rng = random.Random(seed)
+    
+    def add_row(disease_name, severity, row_symptoms):
+        nonlocal n_rows
+        col_idx.extend(SYMPTOM_INDEX[s] for s in row_symptoms)
+        row_starts.append(len(col_idx))
+        diseases[n_rows] = disease_name
+        severities[n_rows] = severity
+        n_rows += 1
     
     print("📊 Génération du dataset d'entraînement...")
     print(f"   Maladies: {len(DISEASE_SYMPTOMS)}")
@@ -105,46 +168,45 @@ def generate_training_data(output_file='data/training_data.csv', variations=True
         symptoms = disease_info["symptoms"]
         
         # Cas 1: Tous les symptômes (cas typique)
-        print(f"   ✓ {disease_name} - cas complet")
-        row = create_symptom_vector(symptoms, ALL_SYMPTOMS)
-        row['disease'] = disease_name
-        row['severity'] = disease_info["severity"]
-        rows.append(row)
+        if verbose:
+            print(f"   ✓ {disease_name} - cas complet")
+        add_row(disease_name, disease_info["severity"], symptoms)
         
         # Cas 2: Symptômes légers (75% des symptômes)
         if variations and len(symptoms) > 2:
             light_symptoms = symptoms[:len(symptoms)-1]
-            row = create_symptom_vector(light_symptoms, ALL_SYMPTOMS)
-            row['disease'] = disease_name
-            row['severity'] = "léger"
-            rows.append(row)
+            add_row(disease_name, "léger", light_symptoms)
         
         # Cas 3: Symptômes graves (tous les symptômes + 1 symptôme aléatoire)
         if variations and len(ALL_SYMPTOMS) > len(symptoms):
-            other_symptoms = [s for s in ALL_SYMPTOMS if s not in symptoms]
-            severe_symptoms = symptoms + [np.random.choice(other_symptoms, 1)[0]]
-            row = create_symptom_vector(severe_symptoms, ALL_SYMPTOMS)
-            row['disease'] = disease_name
-            row['severity'] = "grave"
-            rows.append(row)
+            symptom_set = frozenset(symptoms)
+            other_symptoms = [s for s in ALL_SYMPTOMS if s not in symptom_set]
+            severe_symptoms = symptoms + [rng.choice(other_symptoms)]
+            add_row(disease_name, "grave", severe_symptoms)
         
         # Cas 4: Symptômes minimes (2-3 symptômes principaux)
         if variations and len(symptoms) > 2:
             minimal_symptoms = symptoms[:2]
-            row = create_symptom_vector(minimal_symptoms, ALL_SYMPTOMS)
-            row['disease'] = disease_name
-            row['severity'] = "léger"
-            rows.append(row)
+            add_row(disease_name, "léger", minimal_symptoms)
+    
+    matrix = np.zeros((n_rows, len(ALL_SYMPTOMS)), dtype=np.uint8)
+    matrix[np.repeat(np.arange(n_rows), np.diff(row_starts)), col_idx] = 1
     
     # Créer DataFrame
-    df = pd.DataFrame(rows)
+    df = pd.DataFrame(matrix, columns=ALL_SYMPTOMS).assign(
+        disease=diseases[:n_rows],
+        severity=severities[:n_rows]
+    )
     
     # Créer le dossier s'il existe pas
     os.makedirs(os.path.dirname(output_file) if os.path.dirname(output_file) else '.', 
                 exist_ok=True)
     
     # Sauvegarder
-    df.to_csv(output_file, index=False)
+    if output_format == 'parquet':
+        write_training_parquet(output_file, matrix, df['disease'].tolist(), df['severity'].tolist())
+    else:
+        write_training_csv(output_file, matrix, df['disease'].tolist(), df['severity'].tolist())
     
     print()
     print("✅ Dataset créé avec succès!")
@@ -157,21 +219,75 @@ def generate_training_data(output_file='data/training_data.csv', variations=True
     return df
 
 
+def write_training_csv(output_file, matrix, diseases, severities):
+    """
+    Écrit le dataset (matrice 0/1 + maladie + sévérité) sans passer par
+    le module csv de pandas : une chaîne de format par ligne, une seule
+    écriture bufferisée
+    
+    Args:
+        output_file: chemin du fichier CSV
+        matrix: np.ndarray (n_lignes, n_symptômes) de 0/1
+        diseases: liste des maladies (une par ligne)
+        severities: liste des sévérités (une par ligne)
+    """
+    labels = set(diseases) | set(severities) | set(ALL_SYMPTOMS)
+    if any(c in label for label in labels for c in ',"\n\r'):
+        # Libellés ou noms de colonnes à échapper : laisser pandas gérer les
+        # guillemets
+        pd.DataFrame(matrix, columns=ALL_SYMPTOMS).assign(
+            disease=diseases, severity=severities
+        ).to_csv(output_file, index=False)
+        return
+    
+    line_format = ','.join(['%d'] * matrix.shape[1]) + ',%s,%s\n'
+    with open(output_file, 'w', encoding='utf-8', newline='', buffering=1 << 20) as f:
+        f.write(','.join(ALL_SYMPTOMS + ('disease', 'severity')) + '\n')
+        f.writelines(
+            line_format % (*row, disease, severity)
+            for row, disease, severity in zip(matrix.tolist(), diseases, severities)
+        )
+
+
+def write_training_parquet(output_file, matrix, diseases, severities):
+    """
+    Écrit le dataset en Parquet : une colonne booléenne par symptôme
+    (bit-packée sur disque) + maladie et sévérité
+    
+    Args:
+        output_file: chemin du fichier Parquet
+        matrix: np.ndarray (n_lignes, n_symptômes) de 0/1
+        diseases: liste des maladies (une par ligne)
+        severities: liste des sévérités (une par ligne)
+    """
+    present = matrix.astype(np.bool_)
+    columns = [pa.array(present[:, i]) for i in range(present.shape[1])]
+    columns += [pa.array(diseases, type=pa.string()), pa.array(severities, type=pa.string())]
+    table = pa.Table.from_arrays(columns, names=list(ALL_SYMPTOMS) + ['disease', 'severity'])
+    pq.write_table(table, output_file)
+
+
 def load_training_data(filepath='data/training_data.csv'):
     """
     Charge le dataset d'entraînement
     
     Args:
-        filepath: chemin du fichier CSV
+        filepath: chemin du fichier CSV ou Parquet (.parquet)
         
     Returns:
         pandas DataFrame
     """
+    is_parquet = filepath.endswith('.parquet')
     if not os.path.exists(filepath):
         print(f"⚠️  Fichier {filepath} introuvable. Génération...")
-        return generate_training_data(filepath)
+        return generate_training_data(filepath, output_format='parquet' if is_parquet else 'csv')
     
-    df = pd.read_csv(filepath)
+    if is_parquet:
+        # Les symptômes reviennent en 0/1 comme avec le CSV
+        df = pd.read_parquet(filepath)
+        df[list(ALL_SYMPTOMS)] = df[list(ALL_SYMPTOMS)].astype(np.uint8)
+    else:
+        df = pd.read_csv(filepath, dtype={s: np.uint8 for s in ALL_SYMPTOMS})
     print(f"✅ Dataset chargé: {len(df)} exemples")
     return df
 
@@ -184,19 +300,19 @@ def get_disease_info(disease_name):
         disease_name: nom de la maladie
         
     Returns:
-        dict avec symptômes et sévérité
+        mapping en lecture seule avec symptômes et sévérité (None si inconnue)
     """
-    return DISEASE_SYMPTOMS.get(disease_name, None)
+    return _DISEASE_INFO_VIEWS.get(disease_name)
 
 
 def get_all_symptoms():
-    """Retourne la liste de tous les symptômes"""
+    """Retourne le tuple (trié) de tous les symptômes"""
     return ALL_SYMPTOMS
 
 
 def get_all_diseases():
-    """Retourne la liste de toutes les maladies"""
-    return list(DISEASE_SYMPTOMS.keys())
+    """Retourne le tuple de toutes les maladies"""
+    return ALL_DISEASES
 
 
 def add_disease(disease_name, symptoms, severity="modéré"):
@@ -212,6 +328,7 @@ def add_disease(disease_name, symptoms, severity="modéré"):
         "symptoms": symptoms,
         "severity": severity
     }
+    _rebuild_symptom_index()
     print(f"✅ Maladie ajoutée: {disease_name}")
 
 
@@ -222,27 +339,30 @@ def export_dataset_info(output_file='data/dataset_info.txt'):
     Args:
         output_file: chemin du fichier
     """
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write("=" * 60 + "\n")
-        f.write("DIAGNOX - DATASET INFORMATION\n")
-        f.write("=" * 60 + "\n\n")
-        
-        f.write(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Maladies: {len(DISEASE_SYMPTOMS)}\n")
-        f.write(f"Symptômes uniques: {len(ALL_SYMPTOMS)}\n\n")
-        
-        f.write("MALADIES ET SYMPTÔMES:\n")
-        f.write("-" * 60 + "\n")
-        
-        for disease_name, disease_info in DISEASE_SYMPTOMS.items():
-            f.write(f"\n{disease_name} ({disease_info['severity']})\n")
-            f.write(f"  Symptômes: {', '.join(disease_info['symptoms'])}\n")
-        
-        f.write("\n" + "=" * 60 + "\n")
-        f.write("TOUS LES SYMPTÔMES:\n")
-        f.write("-" * 60 + "\n")
-        for i, symptom in enumerate(ALL_SYMPTOMS, 1):
-            f.write(f"{i:2d}. {symptom}\n")
+    lines = [
+        "=" * 60,
+        "DIAGNOX - DATASET INFORMATION",
+        "=" * 60,
+        "",
+        f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Maladies: {len(DISEASE_SYMPTOMS)}",
+        f"Symptômes uniques: {len(ALL_SYMPTOMS)}",
+        "",
+        "MALADIES ET SYMPTÔMES:",
+        "-" * 60,
+    ]
+    
+    for disease_name, disease_info in DISEASE_SYMPTOMS.items():
+        lines.append("")
+        lines.append(f"{disease_name} ({disease_info['severity']})")
+        lines.append(f"  Symptômes: {', '.join(disease_info['symptoms'])}")
+    
+    lines += ["", "=" * 60, "TOUS LES SYMPTÔMES:", "-" * 60]
+    lines += [f"{i:2d}. {symptom}" for i, symptom in enumerate(ALL_SYMPTOMS, 1)]
+    
+    # Une seule écriture pour tout le fichier
+    with open(output_file, 'w', encoding='utf-8', buffering=1 << 16) as f:
+        f.write('\n'.join(lines) + '\n')
     
     print(f"✅ Info dataset exportée: {output_file}")
 
@@ -254,7 +374,7 @@ if __name__ == "__main__":
     print("="*60 + "\n")
     
     # Générer dataset
-    df = generate_training_data()
+    df = generate_training_data(verbose=True)
     
     # Afficher aperçu
     print("\n📋 Aperçu du dataset:")
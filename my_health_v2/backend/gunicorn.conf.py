@@ -0,0 +1,22 @@
+"""
+Configuration gunicorn pour la production
+Lancer depuis backend/ : gunicorn -c gunicorn.conf.py app:app
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', min(4, multiprocessing.cpu_count())))
+# Les threads d'un worker partagent son MongoClient : garder
+# MONGO_MAX_POOL_SIZE >= threads pour qu'ils n'attendent pas le pool
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+timeout = 120  # premier entraînement du modèle si disease_model.pkl est absent
+preload_app = os.getenv('GUNICORN_PRELOAD', '').lower() in ('1', 'true', 'yes')
+
+
+def post_fork(server, worker):
+    # Un MongoClient ne doit pas être partagé entre processus forkés : avec
+    # --preload, chaque worker recrée le sien (les index existent déjà)
+    if server.cfg.preload_app:
+        import app
+        app.init_mongo(create_indexes=False)
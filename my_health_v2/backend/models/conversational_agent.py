@@ -5,9 +5,101 @@ import os
 import json
 import re
 import random
+import threading
+from collections import deque
 from datetime import datetime
 from openai import OpenAI
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+HISTORY_MAX_MESSAGES = 10
+
+# Un seul client par clé API (donc un seul pool de connexions HTTPS
+# keep-alive) pour toutes les instances de l'agent du processus
+_openai_clients = {}
+_openai_clients_lock = threading.Lock()
+
+def get_openai_client(api_key):
+    """Retourne le client OpenAI partagé pour cette clé, créé au premier appel"""
+    client = _openai_clients.get(api_key)
+    if client is None:
+        with _openai_clients_lock:
+            client = _openai_clients.get(api_key)
+            if client is None:
+                client = _openai_clients[api_key] = OpenAI(api_key=api_key)
+    return client
+
+# Mots-clés de symptômes comptés dans les messages utilisateur
+COMMON_SYMPTOMS = (
+    'fièvre', 'toux', 'douleur', 'fatigue', 'nausée', 'vomissement',
+    'diarrhée', 'maux de tête', 'vertige', 'étourdissement',
+    'essoufflement', 'palpitation', 'frisson', 'sueur',
+    'mal de gorge', 'nez bouché', 'éternuement', 'courbature',
+    'crampe', 'gonflement', 'rougeur', 'démangeaison',
+    'mal de ventre', 'brûlure', 'picotement', 'engourdissement'
+)
+
+def _build_symptom_automaton():
+    """Automate construit une fois : un seul passage sur le message au lieu
+    d'une recherche de sous-chaîne par mot-clé"""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for index, symptom in enumerate(COMMON_SYMPTOMS):
+        automaton.add_word(symptom, index)
+    automaton.make_automaton()
+    return automaton
+
+SYMPTOM_AUTOMATON = _build_symptom_automaton()
+
+# Signaux de _analyze_response : une alternance compilée par catégorie
+EMERGENCY_KEYWORDS = (
+    'urgence', 'samu', '15', 'appeler immédiatement', 
+    'urgences', 'danger', 'grave', 'critique', '🚨'
+)
+ANALYSIS_TRIGGERS = (
+    'analyser', 'diagnostic', 'évaluer', 'prédire',
+    'que pensez-vous', 'quel est le problème', 'c\'est quoi',
+    'qu\'est-ce que j\'ai', 'aide-moi', 'analyse mes symptômes'
+)
+AI_WILL_ANALYZE_PHRASES = (
+    'vais analyser', 'procéder à l\'analyse', 
+    'analyser vos symptômes', 'faire une évaluation',
+    'regarder vos symptômes'
+)
+
+def _keyword_re(keywords):
+    return re.compile('|'.join(map(re.escape, keywords)))
+
+EMERGENCY_RE = _keyword_re(EMERGENCY_KEYWORDS)
+ANALYSIS_TRIGGERS_RE = _keyword_re(ANALYSIS_TRIGGERS)
+AI_WILL_ANALYZE_RE = _keyword_re(AI_WILL_ANALYZE_PHRASES)
+
+# Motifs de _extract_medical_info, compilés une fois (le premier qui correspond gagne)
+DURATION_PATTERNS = (
+    (re.compile(r'depuis (\d+) jours?'), 'days'),
+    (re.compile(r'(\d+) heures?'), 'hours'),
+    (re.compile(r'depuis hier'), 'yesterday'),
+    (re.compile(r'ce matin'), 'this_morning'),
+    (re.compile(r'cette nuit'), 'last_night'),
+    (re.compile(r'depuis (\d+) semaines?'), 'weeks')
+)
+TEMPERATURE_RE = re.compile(r'(\d{2}(?:\.\d)?)[°\s]*(?:c|celsius)?')
+# Intensité : comparaison par mots entiers (formes fléchies incluses), pour
+# ne plus déclencher sur « effort », « confort » ou « peur »
+WORD_RE = re.compile(r'\w+')
+HIGH_SEVERITY_WORDS = frozenset([
+    'intense', 'intenses', 'fort', 'forte', 'forts', 'fortes',
+    'sévère', 'sévères', 'terrible', 'terribles', 'insupportable', 'insupportables'
+])
+LOW_SEVERITY_WORDS = frozenset([
+    'léger', 'légers', 'légère', 'légères', 'faible', 'faibles', 'peu',
+    'modéré', 'modérée', 'modérés', 'modérées'
+])
+
 class ConversationalAgentOpenAI:
     """Agent conversationnel utilisant OpenAI GPT-4"""
     
@@ -22,7 +114,7 @@ class ConversationalAgentOpenAI:
             self.client = None
         else:
             try:
-                self.client = OpenAI(api_key=self.api_key)
+                self.client = get_openai_client(self.api_key)
                 print("✅ Client OpenAI initialisé avec succès")
             except Exception as e:
                 print(f"❌ Erreur initialisation OpenAI: {e}")
@@ -88,7 +180,8 @@ Réponds de manière naturelle et empathique."""
                 'needs_analysis': bool,
                 'emergency': bool,
                 'confidence': float,
-                'collected_info': dict
+                'collected_info': dict,
+                'fallback': bool  # réponse de secours (pas de réponse de l'API)
             }
         """
         try:
@@ -96,11 +189,7 @@ Réponds de manière naturelle et empathique."""
             if not self.client:
                 return self._fallback_response(user_message)
             
-            # Récupérer ou initialiser l'historique
-            if user_id not in self.conversation_history:
-                self.conversation_history[user_id] = []
-            
-            history = self.conversation_history[user_id]
+            history = self._history(user_id)
             
             # Construire les messages avec contexte
             messages = self._build_messages(history, user_message, conversation_context)
@@ -120,10 +209,6 @@ Réponds de manière naturelle et empathique."""
             history.append({"role": "user", "content": user_message})
             history.append({"role": "assistant", "content": ai_response})
             
-            # Limiter l'historique à 10 derniers messages
-            if len(history) > 10:
-                self.conversation_history[user_id] = history[-10:]
-            
             # Analyser la réponse pour détecter les signaux
             analysis = self._analyze_response(ai_response, user_message)
             
@@ -133,7 +218,8 @@ Réponds de manière naturelle et empathique."""
                 'needs_analysis': analysis['needs_analysis'],
                 'emergency': analysis['emergency'],
                 'confidence': analysis['confidence'],
-                'collected_info': analysis['collected_info']
+                'collected_info': analysis['collected_info'],
+                'fallback': False
             }
             
         except Exception as e:
@@ -142,6 +228,25 @@ Réponds de manière naturelle et empathique."""
             traceback.print_exc()
             return self._fallback_response(user_message)
     
+    def _history(self, user_id):
+        """Historique de l'utilisateur, créé au premier tour"""
+        # 10 derniers messages, les plus anciens sont éjectés en O(1) à chaque ajout
+        if user_id not in self.conversation_history:
+            self.conversation_history[user_id] = deque(maxlen=HISTORY_MAX_MESSAGES)
+        return self.conversation_history[user_id]
+    
+    def record_turn(self, user_id, user_message, ai_response):
+        """
+        Ajoute à l'historique un échange dont la réponse est déjà connue (cache
+        de réponses de app.py), comme l'aurait fait handle_conversation. Sans
+        client OpenAI, handle_conversation ne tient pas d'historique : rien à faire.
+        """
+        if not self.client:
+            return
+        history = self._history(user_id)
+        history.append({"role": "user", "content": user_message})
+        history.append({"role": "assistant", "content": ai_response})
+    
     def _build_messages(self, history, user_message, context):
         """Construit les messages avec contexte enrichi"""
         messages = [
@@ -172,32 +277,20 @@ Réponds de manière naturelle et empathique."""
             'collected_info': {}
         }
         
+        ai_lower = ai_response.lower()
+        user_lower = user_message.lower()
+        
         # Détection d'urgence
-        emergency_keywords = [
-            'urgence', 'samu', '15', 'appeler immédiatement', 
-            'urgences', 'danger', 'grave', 'critique', '🚨'
-        ]
-        if any(kw in ai_response.lower() for kw in emergency_keywords):
+        if EMERGENCY_RE.search(ai_lower):
             analysis['emergency'] = True
             analysis['intent'] = 'emergency'
             return analysis
         
-        # Détection de demande d'analyse dans le message utilisateur
-        analysis_triggers = [
-            'analyser', 'diagnostic', 'évaluer', 'prédire',
-            'que pensez-vous', 'quel est le problème', 'c\'est quoi',
-            'qu\'est-ce que j\'ai', 'aide-moi', 'analyse mes symptômes'
-        ]
-        
         # Compter les symptômes mentionnés
-        symptom_count = self._count_symptoms(user_message)
+        symptom_count = self._count_symptoms(user_message, user_lower)
         
         # Vérifier si l'IA dit qu'elle va analyser
-        ai_will_analyze = any(phrase in ai_response.lower() for phrase in [
-            'vais analyser', 'procéder à l\'analyse', 
-            'analyser vos symptômes', 'faire une évaluation',
-            'regarder vos symptômes'
-        ])
+        ai_will_analyze = AI_WILL_ANALYZE_RE.search(ai_lower) is not None
         
         # Décision d'analyse basée sur plusieurs facteurs
         if ai_will_analyze:
@@ -208,61 +301,52 @@ Réponds de manière naturelle et empathique."""
             analysis['needs_analysis'] = True
             analysis['confidence'] = min(0.9, 0.5 + (symptom_count * 0.1))
             analysis['intent'] = 'symptom_analysis'
-        elif any(trigger in user_message.lower() for trigger in analysis_triggers):
+        elif ANALYSIS_TRIGGERS_RE.search(user_lower):
             analysis['needs_analysis'] = True
             analysis['confidence'] = 0.7
             analysis['intent'] = 'diagnosis_request'
         
         # Extraire informations collectées
-        analysis['collected_info'] = self._extract_medical_info(user_message)
+        analysis['collected_info'] = self._extract_medical_info(user_message, user_lower)
         
         return analysis
     
-    def _count_symptoms(self, text):
-        """Compte les symptômes mentionnés dans le texte"""
-        common_symptoms = [
-            'fièvre', 'toux', 'douleur', 'fatigue', 'nausée', 'vomissement',
-            'diarrhée', 'maux de tête', 'vertige', 'étourdissement',
-            'essoufflement', 'palpitation', 'frisson', 'sueur',
-            'mal de gorge', 'nez bouché', 'éternuement', 'courbature',
-            'crampe', 'gonflement', 'rougeur', 'démangeaison',
-            'mal de ventre', 'brûlure', 'picotement', 'engourdissement'
-        ]
+    def _count_symptoms(self, text, text_lower=None):
+        """Compte les symptômes mentionnés dans le texte (text_lower : texte
+        déjà mis en minuscules par l'appelant, pour éviter un second lower())"""
+        if text_lower is None:
+            text_lower = text.lower()
+        if SYMPTOM_AUTOMATON is not None:
+            # Mots-clés distincts, comme le comptage par `in`
+            return len({index for _, index in SYMPTOM_AUTOMATON.iter(text_lower)})
         
-        text_lower = text.lower()
-        count = sum(1 for symptom in common_symptoms if symptom in text_lower)
+        count = sum(1 for symptom in COMMON_SYMPTOMS if symptom in text_lower)
         return count
     
-    def _extract_medical_info(self, text):
+    def _extract_medical_info(self, text, text_lower=None):
         """Extrait des informations médicales structurées du texte"""
         info = {}
+        if text_lower is None:
+            text_lower = text.lower()
         
         # Extraction de la durée
-        duration_patterns = [
-            (r'depuis (\d+) jours?', 'days'),
-            (r'(\d+) heures?', 'hours'),
-            (r'depuis hier', 'yesterday'),
-            (r'ce matin', 'this_morning'),
-            (r'cette nuit', 'last_night'),
-            (r'depuis (\d+) semaines?', 'weeks')
-        ]
-        
-        for pattern, key in duration_patterns:
-            match = re.search(pattern, text.lower())
+        for pattern, key in DURATION_PATTERNS:
+            match = pattern.search(text_lower)
             if match:
                 info['duration'] = match.group(0)
                 break
         
         # Extraction d'intensité
-        if any(word in text.lower() for word in ['intense', 'fort', 'sévère', 'terrible', 'insupportable']):
+        tokens = set(WORD_RE.findall(text_lower))
+        if not HIGH_SEVERITY_WORDS.isdisjoint(tokens):
             info['severity'] = 'high'
-        elif any(word in text.lower() for word in ['léger', 'faible', 'peu', 'modéré']):
+        elif not LOW_SEVERITY_WORDS.isdisjoint(tokens):
             info['severity'] = 'low'
         else:
             info['severity'] = 'medium'
         
         # Extraction de température si mentionnée
-        temp_match = re.search(r'(\d{2}(?:\.\d)?)[°\s]*(?:c|celsius)?', text.lower())
+        temp_match = TEMPERATURE_RE.search(text_lower)
         if temp_match:
             info['temperature'] = temp_match.group(1)
         
@@ -271,7 +355,7 @@ Réponds de manière naturelle et empathique."""
     def _fallback_response(self, user_message):
         """Réponse de secours si l'API n'est pas disponible"""
         user_lower = user_message.lower()
-        symptom_count = self._count_symptoms(user_message)
+        symptom_count = self._count_symptoms(user_message, user_lower)
         
         # Détecter les salutations
         greetings = ['bonjour', 'salut', 'hello', 'hey', 'bonsoir', 'coucou']
@@ -283,7 +367,8 @@ Réponds de manière naturelle et empathique."""
                 'needs_analysis': False,
                 'emergency': False,
                 'confidence': 0.3,
-                'collected_info': {}
+                'collected_info': {},
+                'fallback': True
             }
         
         # Si plusieurs symptômes détectés
@@ -295,7 +380,8 @@ Réponds de manière naturelle et empathique."""
                 'needs_analysis': symptom_count >= 3,
                 'emergency': False,
                 'confidence': 0.6,
-                'collected_info': self._extract_medical_info(user_message)
+                'collected_info': self._extract_medical_info(user_message, user_lower),
+                'fallback': True
             }
         
         # Réponse par défaut
@@ -307,7 +393,8 @@ Réponds de manière naturelle et empathique."""
             'needs_analysis': False,
             'emergency': False,
             'confidence': 0.3,
-            'collected_info': {}
+            'collected_info': {},
+            'fallback': True
         }
     
     def generate_symptom_prompt(self):
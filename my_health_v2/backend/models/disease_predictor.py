@@ -1,15 +1,474 @@
 import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import (CountVectorizer, HashingVectorizer, TfidfTransformer,
+                                             TfidfVectorizer)
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.model_selection import StratifiedKFold, StratifiedShuffleSplit
 from sklearn.metrics import classification_report, confusion_matrix
-from sklearn.preprocessing import LabelEncoder
-import pickle
+from sklearn.preprocessing import LabelEncoder, normalize
+from sklearn.utils.validation import check_is_fitted
+import joblib
+from joblib import Parallel, delayed
+import os
+import warnings
 import json
+import threading
 from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import ydf
+except ImportError:
+    ydf = None
+
+try:
+    import lz4
+except ImportError:
+    lz4 = None
+
+# Entraînement : 4 modèles + 4 x CV_FOLDS plis dans un seul pool de processus,
+# plafonné pour ne pas prendre tous les cœurs du serveur web
+TRAIN_N_JOBS = int(os.getenv('TRAIN_N_JOBS', str(min(4, os.cpu_count() or 1))))
+CV_FOLDS = 5
+
+# Compression du fichier modèle (joblib) : LZ4 se décompresse très vite,
+# zlib niveau 3 à défaut
+MODEL_COMPRESS = ('lz4', 3) if lz4 is not None else 3
+
+# Boosting : arbres initiaux, puis ajoutés à chaque réentraînement à chaud,
+# jusqu'à GB_MAX_TREES (au-delà, modèle neuf de GB_N_ESTIMATORS arbres)
+GB_N_ESTIMATORS = 150
+GB_WARM_START_ITER = 20
+GB_MAX_TREES = 300
+
+# Random Forest sklearn : nombre d'arbres choisi sur le plateau du score OOB
+RF_MAX_TREES = 200
+RF_OOB_STEP = 20
+RF_OOB_PATIENCE = 3
+RF_OOB_TOL = 1e-3
+
+# Threads de predict_batch pour les lots de plusieurs textes (un predict_proba
+# par modèle) : les cœurs natifs des forêts et du boosting relâchent le GIL.
+# Un texte seul (predict) reste en série : quelques ms de travail, que la
+# remise aux threads ralentit. 1 : toujours en série
+PREDICT_WORKERS = int(os.getenv('PREDICT_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# Pool partagé par tous les DiseasePredictor (un réentraînement en crée un
+# nouveau), créé au premier lot
+_predict_pool = None
+_predict_pool_lock = threading.Lock()
+
+
+def _get_predict_pool():
+    global _predict_pool
+    if _predict_pool is None:
+        with _predict_pool_lock:
+            if _predict_pool is None:
+                _predict_pool = ThreadPoolExecutor(max_workers=PREDICT_WORKERS,
+                                                   thread_name_prefix='diagnox-predict')
+    return _predict_pool
+
+# Vectorisations TF-IDF mémorisées par texte (les formulations se répètent)
+TRANSFORM_CACHE_SIZE = 1024
+
+
+# Dataset d'entraînement par défaut : (maladie, variations de symptômes)
+_BASE_DATA = (
+    ('grippe', (
+        'fièvre élevée toux sèche fatigue intense courbatures maux de tête frissons',
+        'forte fièvre courbatures toux fatigue maux de tête',
+        'fièvre courbatures toux frissons fatigue',
+        'température élevée courbatures généralisées toux sèche',
+        'fièvre 39 courbatures fatigue intense maux de tête',
+        'syndrome grippal fièvre courbatures toux',
+        'fièvre courbatures articulaires fatigue extrême',
+        'fièvre haute toux sèche courbatures maux de tête intenses',
+    )),
+    ('rhume', (
+        'nez bouché éternuements mal de gorge toux légère',
+        'nez qui coule éternuements gorge qui gratte',
+        'rhinite éternuements nez bouché légère toux',
+        'nez congestionné éternuements fréquents mal de gorge',
+        'écoulement nasal éternuements gorge irritée',
+        'nez bouché éternuements toux légère gorge qui gratte',
+        'rhinite aiguë éternuements nez qui coule',
+        'congestion nasale éternuements mal de gorge léger',
+    )),
+    ('angine', (
+        'mal de gorge intense difficulté à avaler fièvre ganglions',
+        'gorge très douloureuse fièvre ganglions gonflés',
+        'douleur gorge intense déglutition difficile fièvre',
+        'mal de gorge sévère fièvre ganglions cervicaux',
+        'pharyngite aiguë douleur gorge fièvre',
+        'gorge enflammée difficulté avaler fièvre élevée',
+        'amygdales gonflées mal de gorge intense fièvre',
+        'douleur gorge aiguë fièvre ganglions palpables',
+    )),
+    ('gastro-entérite', (
+        'diarrhée vomissements nausées crampes abdominales',
+        'diarrhée aiguë vomissements douleurs ventre',
+        'vomissements diarrhée crampes abdominales nausées',
+        'troubles digestifs diarrhée vomissements crampes',
+        'diarrhée liquide vomissements douleurs abdominales',
+        'gastro diarrhée vomissements crampes intestinales',
+        'vomissements répétés diarrhée aiguë crampes ventre',
+        'diarrhée vomissements déshydratation crampes abdominales',
+    )),
+    ('migraine', (
+        'maux de tête intenses sensibilité lumière nausées',
+        'céphalées pulsatiles photophobie nausées',
+        'mal de tête sévère lumière insupportable nausées',
+        'migraine intense sensibilité au bruit nausées',
+        'douleur crânienne pulsatile photophobie phonophobie',
+        'céphalée intense lumière gênante nausées vomissements',
+        'mal de tête unilatéral sensibilité lumière son',
+        'migraine sévère aura visuelle nausées',
+    )),
+    ('allergie', (
+        'éternuements démangeaisons yeux rouges nez qui coule',
+        'rhinite allergique éternuements yeux qui piquent',
+        'yeux irrités éternuements nez qui coule démangeaisons',
+        'allergie saisonnière éternuements larmoiement',
+        'éternuements fréquents yeux rouges nez qui coule',
+        'rhinite allergique éternuements démangeaisons nasales',
+        'yeux qui pleurent éternuements nez bouché démangeaisons',
+        'allergie pollen éternuements yeux irrités nez qui coule',
+    )),
+    ('bronchite', (
+        'toux grasse expectorations fatigue légère fièvre',
+        'toux productive mucus fièvre modérée',
+        'bronchite aiguë toux grasse expectorations',
+        'toux avec glaires fièvre fatigue respiration sifflante',
+        'toux productive fièvre légère essoufflement',
+        'toux grasse persistante fatigue fièvre',
+        'expectorations abondantes toux grasse fièvre',
+        'bronchite toux productive difficultés respiratoires légères',
+    )),
+    ('sinusite', (
+        'douleur faciale nez bouché maux de tête pression sinusale',
+        'sinusite frontale douleur front nez congestionné',
+        'pression au niveau des sinus douleur faciale nez bouché',
+        'douleur sinus maxillaires nez bouché maux de tête',
+        'congestion nasale douleur pression faciale',
+        'sinusite aiguë douleur front joues nez bouché',
+        'pression sinusale douleur faciale sécrétions nasales',
+        'douleur sinus nez bouché maux de tête frontaux',
+    )),
+)
+
+
+@lru_cache(maxsize=1)
+def _default_training_df():
+    """
+    DataFrame du dataset par défaut, construit une seule fois par processus
+    (partagé : à ne pas modifier en place)
+    """
+    # Directement par colonnes : pd.DataFrame(dict de listes) évite
+    # l'unification des clés d'une liste de dicts
+    symptoms_column = []
+    disease_column = []
+    for disease, symptom_lists in _BASE_DATA:
+        symptoms_column.extend(symptom_lists)
+        disease_column.extend([disease] * len(symptom_lists))
+    return pd.DataFrame({'symptoms': symptoms_column, 'disease': disease_column})
+
+
+def _vote(preds, confidences, n_classes):
+    """
+    Vote majoritaire pour chaque texte (colonne de preds, une ligne par modèle).
+    À égalité, la maladie du premier modèle qui l'a prédite l'emporte, comme
+    Counter.most_common. Retourne (gagnants, confiance moyenne des modèles
+    gagnants, consensus, votes par classe (n_textes, n_classes)).
+    """
+    n_models, n_texts = preds.shape
+    columns = np.arange(n_texts)
+    counts = np.zeros((n_texts, n_classes), dtype=np.int64)
+    np.add.at(counts, (columns, preds), 1)
+    votes = counts[columns, preds]
+    first_winner = (votes == votes.max(axis=0)).argmax(axis=0)
+    winners = preds[first_winner, columns]
+    agree = preds == winners
+    avg_confidences = (confidences * agree).sum(axis=0) / agree.sum(axis=0)
+    return winners, avg_confidences, agree.all(axis=0), counts
+
+
+# Modèles entraînés sur les comptages bruts (entiers) plutôt que sur le
+# TF-IDF : MultinomialNB modélise des comptages
+COUNT_FEATURE_MODELS = frozenset(['naive_bayes'])
+COUNT_DTYPE = np.int16
+
+
+class _InPlaceTfidfVectorizer(TfidfVectorizer):
+    """
+    TfidfVectorizer dont transform pondère les comptages sur place : idf
+    appliqué directement sur X.data (indexé par X.indices) puis normalisation
+    L2 sans copie, sans repasser par la validation de TfidfTransformer.
+    Mêmes valeurs que TfidfVectorizer.transform ; fit est inchangé.
+    """
+    
+    def transform(self, raw_documents):
+        return self.transform_with_counts(raw_documents)[1]
+    
+    def transform_with_counts(self, raw_documents):
+        """Retourne (comptages COUNT_DTYPE, TF-IDF) pour une seule tokenisation"""
+        check_is_fitted(self, msg="The TF-IDF vectorizer is not fitted")
+        
+        X = CountVectorizer.transform(self, raw_documents).astype(self.dtype, copy=False)
+        counts = X.astype(COUNT_DTYPE)
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        if self.use_idf:
+            np.multiply(X.data, self.idf_.take(X.indices), out=X.data)
+        if self.norm is not None:
+            X = normalize(X, norm=self.norm, copy=False)
+        return counts, X
+
+
+class _HashingTfidfVectorizer(BaseEstimator):
+    """
+    Variante sans vocabulaire : n-grammes hachés dans n_features colonnes
+    (HashingVectorizer) puis pondération TF-IDF. Aucun dict de vocabulaire
+    à garder en mémoire ni à sérialiser, et la même colonne pour un n-gramme
+    d'un entraînement à l'autre. Les noms de features sont les index de
+    colonne ('hash_<i>'). Même interface que _InPlaceTfidfVectorizer.
+    """
+    
+    def __init__(self, n_features=2048, ngram_range=(1, 3), dtype=np.float32):
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.dtype = dtype
+    
+    def _hash_counts(self, raw_documents):
+        return HashingVectorizer(
+            n_features=self.n_features,
+            ngram_range=self.ngram_range,
+            alternate_sign=False,
+            norm=None,
+            dtype=self.dtype
+        ).transform(raw_documents)
+    
+    def fit(self, raw_documents, y=None):
+        self._tfidf = TfidfTransformer().fit(self._hash_counts(raw_documents))
+        self.idf_ = self._tfidf.idf_
+        return self
+    
+    def transform(self, raw_documents):
+        return self.transform_with_counts(raw_documents)[1]
+    
+    def transform_with_counts(self, raw_documents):
+        """Retourne (comptages COUNT_DTYPE, TF-IDF) pour un seul hachage"""
+        check_is_fitted(self, 'idf_')
+        X = self._hash_counts(raw_documents)
+        counts = X.astype(COUNT_DTYPE)
+        return counts, self._tfidf.transform(X, copy=False)
+    
+    def get_feature_names_out(self, input_features=None):
+        return np.array([f'hash_{i}' for i in range(self.n_features)], dtype=object)
+
+
+# Vectorisation du texte : 'tfidf' (vocabulaire, noms de features lisibles)
+# ou 'hashing' (sans vocabulaire, voir _HashingTfidfVectorizer)
+VECTORIZER = os.getenv('DISEASE_VECTORIZER', 'tfidf').lower()
+
+
+def _make_vectorizer():
+    if VECTORIZER == 'hashing':
+        return _HashingTfidfVectorizer(n_features=2048, ngram_range=(1, 3))
+    # TF-IDF en float32 (précision suffisante, moitié moins de bande
+    # passante dans les produits creux)
+    return _InPlaceTfidfVectorizer(
+        dtype=np.float32,
+        max_features=500,
+        ngram_range=(1, 3),  # Unigrammes, bigrammes, trigrammes
+        min_df=2,
+        max_df=0.8
+    )
+
+
+def _model_input(name, counts, tfidf):
+    """
+    Matrice d'entrée du modèle `name`. Les deux restent en CSR : c'est le
+    format que LogisticRegression et MultinomialNB valident sans copie
+    (accept_sparse='csr'), une conversion en CSC en ajouterait une.
+    """
+    return counts if name in COUNT_FEATURE_MODELS else tfidf
+
+
+class _YdfRandomForest(ClassifierMixin, BaseEstimator):
+    """
+    Random Forest ydf à coupes obliques creuses (combinaisons linéaires de
+    features), adaptées aux n-grammes TF-IDF corrélés : autant de précision
+    avec moitié moins d'arbres que le Random Forest sklearn (mais, sur le
+    dataset par défaut, une précision de test inférieure). Expose
+    fit/predict/predict_proba/feature_importances_ comme un estimateur sklearn
+    (clone et cross_val_score fonctionnent).
+    """
+    
+    def __init__(self, num_trees=100, max_depth=16, min_examples=1,
+                 split_axis='SPARSE_OBLIQUE', random_seed=42):
+        self.num_trees = num_trees
+        self.max_depth = max_depth
+        self.min_examples = min_examples
+        self.split_axis = split_axis
+        self.random_seed = random_seed
+    
+    @staticmethod
+    def _columns(X):
+        X = _to_dense_float32(X)
+        return {f'f{i}': X[:, i] for i in range(X.shape[1])}
+    
+    def fit(self, X, y):
+        y = np.asarray(y)
+        self.classes_ = np.unique(y)
+        self.n_features_in_ = X.shape[1]
+        data = self._columns(X)
+        data['label'] = y
+        oblique = {}
+        if self.split_axis == 'SPARSE_OBLIQUE':
+            oblique = {'sparse_oblique_normalization': 'MIN_MAX',
+                       'sparse_oblique_num_projections_exponent': 1.0}
+        self.model_ = ydf.RandomForestLearner(
+            label='label',
+            task=ydf.Task.CLASSIFICATION,
+            num_trees=self.num_trees,
+            max_depth=self.max_depth,
+            min_examples=self.min_examples,
+            split_axis=self.split_axis,
+            random_seed=self.random_seed,
+            **oblique
+        ).train(data, verbose=0)
+        
+        # ydf trie ses classes comme des chaînes ('10' < '2') : colonnes de
+        # predict_proba remises dans l'ordre de classes_
+        ydf_classes = [int(c) for c in self.model_.label_classes()]
+        self._proba_order = np.array([ydf_classes.index(c) for c in self.classes_])
+        
+        # Importance : somme des gains de coupe par feature, normalisée
+        importances = np.zeros(self.n_features_in_)
+        for score, name in self.model_.variable_importances().get('SUM_SCORE', []):
+            importances[int(name[1:])] = score
+        total = importances.sum()
+        self.feature_importances_ = importances / total if total > 0 else importances
+        return self
+    
+    def predict_proba(self, X):
+        proba = np.asarray(self.model_.predict(self._columns(X)))
+        if proba.ndim == 1:  # 2 classes : ydf ne renvoie que la seconde
+            proba = np.column_stack([1 - proba, proba])
+        return proba[:, self._proba_order]
+    
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+    
+    # Sérialisation ydf native plutôt que le pickle de ses objets C++
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if 'model_' in state:
+            state['model_'] = self.model_.serialize()
+        return state
+    
+    def __setstate__(self, state):
+        if 'model_' in state:
+            state['model_'] = ydf.deserialize_model(state['model_'])
+        self.__dict__.update(state)
+
+
+# Random Forest : 'sklearn' (par défaut) ou 'ydf' (coupes obliques, voir
+# _YdfRandomForest ; plus rapide mais moins précis sur le dataset par défaut)
+RANDOM_FOREST = os.getenv('DISEASE_RANDOM_FOREST', 'sklearn').lower()
+
+
+def _make_random_forest():
+    """Random Forest ydf oblique si demandé par DISEASE_RANDOM_FOREST et installé, sinon sklearn"""
+    if RANDOM_FOREST == 'ydf':
+        if ydf is not None:
+            # min_examples=1 : le défaut (5) coupe trop tôt sur 51 exemples
+            return _YdfRandomForest(num_trees=100, max_depth=16, min_examples=1, random_seed=42)
+        warnings.warn("DISEASE_RANDOM_FOREST=ydf mais ydf n'est pas installé (pip install ydf) : "
+                      "Random Forest sklearn")
+    return RandomForestClassifier(
+        n_estimators=RF_MAX_TREES,  # réduit à l'entraînement, voir _fit_random_forest_oob
+        max_depth=15,
+        min_samples_split=5,
+        min_samples_leaf=2,
+        class_weight='balanced',
+        random_state=42
+    )
+
+
+def _to_dense_float32(X):
+    """TF-IDF creux -> dense float32 pour les colonnes ydf (500 au plus)"""
+    return X.toarray().astype(np.float32, copy=False) if hasattr(X, 'toarray') else np.asarray(X, dtype=np.float32)
+
+
+@lru_cache(maxsize=8)
+def _stratified_splits(y_dtype, y_bytes):
+    """
+    Indices du split train/test stratifié (20 %, identique à
+    train_test_split(stratify=y, random_state=42)) et plis de validation
+    croisée sur la partie train, ceux de cross_val_score(cv=CV_FOLDS)
+    (StratifiedKFold sans mélange). Mémorisé par contenu exact des labels :
+    un réentraînement sur le même dataset réutilise les mêmes indices.
+    """
+    y = np.frombuffer(y_bytes, dtype=y_dtype)
+    splitter = StratifiedShuffleSplit(n_splits=1, test_size=0.2, random_state=42)
+    train_index, test_index = next(splitter.split(np.zeros((len(y), 1)), y))
+    folds = tuple(StratifiedKFold(n_splits=CV_FOLDS).split(train_index, y[train_index]))
+    return train_index, test_index, folds
+
+
+def _fit_random_forest_oob(rf, X, y):
+    """
+    Fait pousser le Random Forest sklearn par paliers de RF_OOB_STEP arbres
+    (warm_start) jusqu'à ce que le score OOB plafonne (gain < RF_OOB_TOL sur
+    RF_OOB_PATIENCE paliers), au plus RF_MAX_TREES : les arbres au-delà du
+    plateau ne coûtent qu'en prédiction et en taille de fichier.
+    """
+    rf = clone(rf).set_params(warm_start=True, oob_score=True)
+    oob_scores = []
+    with warnings.catch_warnings():
+        # class_weight='balanced' + warm_start : même jeu de données à chaque
+        # palier, l'avertissement de sklearn ne s'applique pas
+        warnings.filterwarnings('ignore', message='.*warm_start.*', category=UserWarning)
+        # premiers paliers : quelques exemples sans estimation OOB, sans effet sur le plateau
+        warnings.filterwarnings('ignore', message='Some inputs do not have OOB scores', category=UserWarning)
+        for n_trees in range(RF_OOB_STEP, RF_MAX_TREES + 1, RF_OOB_STEP):
+            rf.set_params(n_estimators=n_trees)
+            rf.fit(X, y)
+            oob_scores.append(rf.oob_score_)
+            if (len(oob_scores) > RF_OOB_PATIENCE and
+                    max(oob_scores[-RF_OOB_PATIENCE:]) - oob_scores[-RF_OOB_PATIENCE - 1] < RF_OOB_TOL):
+                break
+    # Les clones (validation croisée, réentraînement) repartent de zéro
+    # avec le nombre d'arbres retenu
+    return rf.set_params(warm_start=False, oob_score=False)
+
+
+def _fit_one(name, model, X_train, y_train, X_test, y_test):
+    """
+    Entraîne et évalue un modèle ; exécuté dans un worker joblib, d'où la
+    fonction de module (sérialisable) et le retour du modèle entraîné
+    """
+    if isinstance(model, RandomForestClassifier):
+        model = _fit_random_forest_oob(model, X_train, y_train)
+    else:
+        model.fit(X_train, y_train)
+    
+    # Évaluation
+    return name, model, model.score(X_train, y_train), model.score(X_test, y_test)
+
+
+def _cv_fold_score(name, model, X, y, train_index, test_index):
+    """Score d'un pli de validation croisée, sur une copie non entraînée du modèle"""
+    fold_model = clone(model)
+    fold_model.fit(X[train_index], y[train_index])
+    return name, fold_model.score(X[test_index], y[test_index])
+
 
 class DiseasePredictor:
     """
@@ -17,27 +476,18 @@ class DiseasePredictor:
     """
     
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(
-            max_features=500,
-            ngram_range=(1, 3),  # Unigrammes, bigrammes, trigrammes
-            min_df=2,
-            max_df=0.8
-        )
+        self.vectorizer = _make_vectorizer()
         
         # Ensemble de modèles
         self.models = {
-            'random_forest': RandomForestClassifier(
-                n_estimators=200,
-                max_depth=15,
-                min_samples_split=5,
-                min_samples_leaf=2,
-                class_weight='balanced',
-                random_state=42
-            ),
+            'random_forest': _make_random_forest(),
             'gradient_boosting': GradientBoostingClassifier(
-                n_estimators=150,
+                n_estimators=GB_N_ESTIMATORS,
                 learning_rate=0.1,
                 max_depth=5,
+                # Réentraînement sur le même espace de features : on complète
+                # les arbres existants au lieu de repartir de zéro
+                warm_start=True,
                 random_state=42
             ),
             'logistic_regression': LogisticRegression(
@@ -52,18 +502,48 @@ class DiseasePredictor:
         self.is_trained = False
         self.training_history = []
         self.feature_importance = {}
+        self._importance_vec = None
+        self._vectorizer_changed()
         
+    def _importance_vector(self):
+        """
+        feature_importance (top 20, pour le JSON) sous forme de vecteur dense
+        aligné sur le vocabulaire, indexé par colonne CSR ; 0 hors du top 20
+        """
+        vec = np.zeros(len(self._feature_names), dtype=np.float64)
+        vocabulary = {feature: i for i, feature in enumerate(self._feature_names)}
+        for feature, importance in self.feature_importance.items():
+            index = vocabulary.get(feature)
+            if index is not None:
+                vec[index] = importance
+        return vec
+    
+    def _vectorizer_changed(self):
+        """Nouveau cache de transform et noms de features, à appeler quand le
+        vectorizer change (fit, chargement)"""
+        self._transform_cached = lru_cache(maxsize=TRANSFORM_CACHE_SIZE)(self._transform_one)
+        self._feature_names = (self.vectorizer.get_feature_names_out()
+                               if hasattr(self.vectorizer, 'idf_') else None)
+    
+    def _transform_one(self, text):
+        # (comptages, TF-IDF) CSR (1, n_features) partagés entre appels : ne
+        # pas les modifier
+        return self.vectorizer.transform_with_counts([text])
+    
     def train(self, training_data=None):
         """
         Entraîne tous les modèles avec un dataset enrichi
+        
+        training_data: dict de colonnes {'symptoms': [...], 'disease': [...]}
+        ou liste de dicts {'symptoms', 'disease'}
         """
         print("Démarrage entraînement multi-modèles...")
         
         # Dataset médical enrichi (basé sur votre MEDICAL_KNOWLEDGE)
         if training_data is None:
-            training_data = self._create_training_dataset()
-        
-        df = pd.DataFrame(training_data)
+            df = self._create_training_dataset()
+        else:
+            df = pd.DataFrame(training_data)
         
         print(f"Dataset: {len(df)} exemples, {df['disease'].nunique()} maladies")
         
@@ -71,39 +551,60 @@ class DiseasePredictor:
         X_text = df['symptoms']
         y = df['disease']
         
+        # Espace de features du modèle actuel, pour le boosting à chaud
+        previous_space = self._feature_space() if self.is_trained else None
+        
         # Vectorisation TF-IDF
-        X_features = self.vectorizer.fit_transform(X_text)
+        self.vectorizer.fit(X_text)
+        self._vectorizer_changed()
+        X_counts, X_features = self.vectorizer.transform_with_counts(X_text)
         
         # Encodage des labels
         y_encoded = self.label_encoder.fit_transform(y)
         
-        # Split train/test
-        X_train, X_test, y_train, y_test = train_test_split(
-            X_features, y_encoded, test_size=0.2, random_state=42, stratify=y_encoded
-        )
+        self._prepare_gradient_boosting(warm=previous_space == self._feature_space())
         
-        # Entraînement de chaque modèle
-        results = {}
+        # Split train/test et plis mémorisés : ils ne dépendent que des labels
+        train_index, test_index, folds = _stratified_splits(y_encoded.dtype.str, y_encoded.tobytes())
+        X_train, X_test = X_features[train_index], X_features[test_index]
+        counts_train, counts_test = X_counts[train_index], X_counts[test_index]
+        y_train, y_test = y_encoded[train_index], y_encoded[test_index]
+        
+        # Entraînement des modèles et plis de validation croisée : toutes les
+        # tâches (4 + 4 x CV_FOLDS) partagent un seul pool
+        tasks = []
         for name, model in self.models.items():
-            print(f"\nEntraînement: {name}")
-            
-            model.fit(X_train, y_train)
-            
-            # Évaluation
-            train_score = model.score(X_train, y_train)
-            test_score = model.score(X_test, y_test)
-            
-            # Cross-validation
-            cv_scores = cross_val_score(model, X_train, y_train, cv=5)
-            
-            results[name] = {
+            model_train = _model_input(name, counts_train, X_train)
+            tasks.append(delayed(_fit_one)(name, model, model_train, y_train,
+                                           _model_input(name, counts_test, X_test), y_test))
+            tasks.extend(delayed(_cv_fold_score)(name, model, model_train, y_train,
+                                                 fold_train, fold_test)
+                         for fold_train, fold_test in folds)
+        
+        print(f"\nEntraînement: {', '.join(self.models)} "
+              f"({len(tasks)} tâches, {TRAIN_N_JOBS} worker(s))")
+        outputs = Parallel(n_jobs=TRAIN_N_JOBS, backend='loky')(tasks)
+        
+        fold_scores = {name: [] for name in self.models}
+        fitted = []
+        for output in outputs:
+            if len(output) == 2:
+                fold_scores[output[0]].append(output[1])
+            else:
+                fitted.append(output)
+        
+        results = {}
+        for name, model, train_score, test_score in fitted:
+            self.models[name] = model
+            cv_scores = np.array(fold_scores[name])
+            results[name] = scores = {
                 'train_accuracy': train_score,
                 'test_accuracy': test_score,
                 'cv_mean': cv_scores.mean(),
                 'cv_std': cv_scores.std()
             }
-            
-            print(f"   Train: {train_score:.3f} | Test: {test_score:.3f} | CV: {cv_scores.mean():.3f} +/-{cv_scores.std():.3f}")
+            print(f"   {name} - Train: {scores['train_accuracy']:.3f} | Test: {scores['test_accuracy']:.3f} | "
+                  f"CV: {scores['cv_mean']:.3f} +/-{scores['cv_std']:.3f}")
         
         # Calcul de l'importance des features (Random Forest)
         self._calculate_feature_importance()
@@ -114,7 +615,9 @@ class DiseasePredictor:
         self.training_history.append({
             'timestamp': datetime.now().isoformat(),
             'dataset_size': len(df),
-            'results': results
+            'results': results,
+            'gradient_boosting_trees': int(self.models['gradient_boosting'].n_estimators_),
+            'random_forest_trees': self._random_forest_trees()
         })
         
         print(f"\nEntraînement terminé!")
@@ -122,156 +625,94 @@ class DiseasePredictor:
         
         return results
     
+    def _random_forest_trees(self):
+        rf = self.models['random_forest']
+        return int(rf.num_trees if isinstance(rf, _YdfRandomForest) else rf.n_estimators)
+    
+    def _feature_space(self):
+        """Vocabulaire et classes : le boosting ne peut être complété que
+        s'ils sont inchangés"""
+        return (tuple(self._feature_names),
+                tuple(self.label_encoder.classes_))
+    
+    def _prepare_gradient_boosting(self, warm):
+        """
+        warm=True : le prochain fit ajoute GB_WARM_START_ITER arbres au modèle
+        entraîné. Sinon (premier entraînement, vocabulaire ou maladies
+        modifiés, GB_MAX_TREES atteint) : modèle neuf de GB_N_ESTIMATORS arbres.
+        """
+        gb = self.models['gradient_boosting']
+        n_trees = gb.n_estimators_ + GB_WARM_START_ITER if warm else None
+        if n_trees is not None and n_trees <= GB_MAX_TREES:
+            gb.set_params(warm_start=True, n_estimators=n_trees)
+        else:
+            self.models['gradient_boosting'] = clone(gb).set_params(
+                warm_start=True, n_estimators=GB_N_ESTIMATORS)
+    
     def _create_training_dataset(self):
         """
-        Crée un dataset d'entraînement enrichi avec variations
+        Dataset d'entraînement par défaut (_BASE_DATA), mémorisé au niveau du module
         """
-        base_data = {
-            'grippe': [
-                'fièvre élevée toux sèche fatigue intense courbatures maux de tête frissons',
-                'forte fièvre courbatures toux fatigue maux de tête',
-                'fièvre courbatures toux frissons fatigue',
-                'température élevée courbatures généralisées toux sèche',
-                'fièvre 39 courbatures fatigue intense maux de tête',
-                'syndrome grippal fièvre courbatures toux',
-                'fièvre courbatures articulaires fatigue extrême',
-                'fièvre haute toux sèche courbatures maux de tête intenses'
-            ],
-            'rhume': [
-                'nez bouché éternuements mal de gorge toux légère',
-                'nez qui coule éternuements gorge qui gratte',
-                'rhinite éternuements nez bouché légère toux',
-                'nez congestionné éternuements fréquents mal de gorge',
-                'écoulement nasal éternuements gorge irritée',
-                'nez bouché éternuements toux légère gorge qui gratte',
-                'rhinite aiguë éternuements nez qui coule',
-                'congestion nasale éternuements mal de gorge léger'
-            ],
-            'angine': [
-                'mal de gorge intense difficulté à avaler fièvre ganglions',
-                'gorge très douloureuse fièvre ganglions gonflés',
-                'douleur gorge intense déglutition difficile fièvre',
-                'mal de gorge sévère fièvre ganglions cervicaux',
-                'pharyngite aiguë douleur gorge fièvre',
-                'gorge enflammée difficulté avaler fièvre élevée',
-                'amygdales gonflées mal de gorge intense fièvre',
-                'douleur gorge aiguë fièvre ganglions palpables'
-            ],
-            'gastro-entérite': [
-                'diarrhée vomissements nausées crampes abdominales',
-                'diarrhée aiguë vomissements douleurs ventre',
-                'vomissements diarrhée crampes abdominales nausées',
-                'troubles digestifs diarrhée vomissements crampes',
-                'diarrhée liquide vomissements douleurs abdominales',
-                'gastro diarrhée vomissements crampes intestinales',
-                'vomissements répétés diarrhée aiguë crampes ventre',
-                'diarrhée vomissements déshydratation crampes abdominales'
-            ],
-            'migraine': [
-                'maux de tête intenses sensibilité lumière nausées',
-                'céphalées pulsatiles photophobie nausées',
-                'mal de tête sévère lumière insupportable nausées',
-                'migraine intense sensibilité au bruit nausées',
-                'douleur crânienne pulsatile photophobie phonophobie',
-                'céphalée intense lumière gênante nausées vomissements',
-                'mal de tête unilatéral sensibilité lumière son',
-                'migraine sévère aura visuelle nausées'
-            ],
-            'allergie': [
-                'éternuements démangeaisons yeux rouges nez qui coule',
-                'rhinite allergique éternuements yeux qui piquent',
-                'yeux irrités éternuements nez qui coule démangeaisons',
-                'allergie saisonnière éternuements larmoiement',
-                'éternuements fréquents yeux rouges nez qui coule',
-                'rhinite allergique éternuements démangeaisons nasales',
-                'yeux qui pleurent éternuements nez bouché démangeaisons',
-                'allergie pollen éternuements yeux irrités nez qui coule'
-            ],
-            'bronchite': [
-                'toux grasse expectorations fatigue légère fièvre',
-                'toux productive mucus fièvre modérée',
-                'bronchite aiguë toux grasse expectorations',
-                'toux avec glaires fièvre fatigue respiration sifflante',
-                'toux productive fièvre légère essoufflement',
-                'toux grasse persistante fatigue fièvre',
-                'expectorations abondantes toux grasse fièvre',
-                'bronchite toux productive difficultés respiratoires légères'
-            ],
-            'sinusite': [
-                'douleur faciale nez bouché maux de tête pression sinusale',
-                'sinusite frontale douleur front nez congestionné',
-                'pression au niveau des sinus douleur faciale nez bouché',
-                'douleur sinus maxillaires nez bouché maux de tête',
-                'congestion nasale douleur pression faciale',
-                'sinusite aiguë douleur front joues nez bouché',
-                'pression sinusale douleur faciale sécrétions nasales',
-                'douleur sinus nez bouché maux de tête frontaux'
-            ]
-        }
-        
-        # Générer le dataset
-        training_data = []
-        for disease, symptom_lists in base_data.items():
-            for symptoms in symptom_lists:
-                training_data.append({
-                    'symptoms': symptoms,
-                    'disease': disease
-                })
-        
-        return training_data
+        return _default_training_df()
     
     def predict(self, symptoms_text):
         """
         Prédiction avec vote majoritaire (ensemble learning)
         """
+        return self.predict_batch([symptoms_text])[0]
+    
+    def predict_batch(self, texts):
+        """
+        Prédictions pour une liste de textes : une seule vectorisation et un
+        predict_proba par modèle pour tout le lot
+        
+        Returns:
+            liste de résultats au format de predict(), dans l'ordre de texts
+        """
         if not self.is_trained:
             raise Exception("Modèle non entraîné")
         
-        # Vectorisation
-        X = self.vectorizer.transform([symptoms_text])
-        
-        # Prédictions de chaque modèle
-        predictions = {}
-        probabilities = {}
-        
-        for name, model in self.models.items():
-            pred = model.predict(X)[0]
-            pred_disease = self.label_encoder.inverse_transform([pred])[0]
-            
-            # Probabilités (si disponible)
-            if hasattr(model, 'predict_proba'):
-                proba = model.predict_proba(X)[0]
-                max_proba = np.max(proba)
-                probabilities[name] = {
-                    'disease': pred_disease,
-                    'confidence': float(max_proba * 100)
-                }
-            else:
-                probabilities[name] = {
-                    'disease': pred_disease,
-                    'confidence': 50.0
-                }
-            
-            predictions[name] = pred_disease
-        
-        # Vote majoritaire
-        from collections import Counter
-        vote_counts = Counter(predictions.values())
-        final_disease = vote_counts.most_common(1)[0][0]
+        # Vectorisation (mémorisée pour un texte seul, cas de predict)
+        counts, X = (self._transform_cached(texts[0]) if len(texts) == 1
+                     else self.vectorizer.transform_with_counts(texts))
+        
+        # Probabilités de chaque modèle : (n_modèles, n_textes, n_classes),
+        # les modèles en parallèle sur le pool pour un lot
+        names = list(self.models)
+        inputs = [(model, _model_input(name, counts, X)) for name, model in self.models.items()]
+        if PREDICT_WORKERS <= 1 or len(texts) == 1:
+            probas = [model.predict_proba(model_input) for model, model_input in inputs]
+        else:
+            pool = _get_predict_pool()
+            futures = [pool.submit(model.predict_proba, model_input)
+                       for model, model_input in inputs]
+            probas = [future.result() for future in futures]
+        probas = np.stack(probas)
+        preds = probas.argmax(axis=-1)                  # (n_modèles, n_textes)
+        confidences = probas.max(axis=-1) * 100
+        
+        # Vote majoritaire et confiance moyenne des modèles gagnants
+        final, avg_confidences, consensus, counts = _vote(
+            preds, confidences, self.label_encoder.classes_.shape[0]
+        )
         
-        # Confiance moyenne
-        avg_confidence = np.mean([
-            p['confidence'] for p in probabilities.values() 
-            if p['disease'] == final_disease
-        ])
+        classes = self.label_encoder.classes_
+        results = []
+        for j in range(preds.shape[1]):
+            model_preds = preds[:, j]
+            results.append({
+                'predicted_disease': classes[final[j]],
+                'confidence': round(avg_confidences[j], 2),
+                # Maladies dans l'ordre de première apparition, comme Counter
+                'voting_details': {classes[c]: int(counts[j, c]) for c in model_preds},
+                'model_predictions': {
+                    name: {'disease': classes[model_preds[i]], 'confidence': float(confidences[i, j])}
+                    for i, name in enumerate(names)
+                },
+                'consensus': bool(consensus[j])  # Tous d'accord?
+            })
         
-        return {
-            'predicted_disease': final_disease,
-            'confidence': round(avg_confidence, 2),
-            'voting_details': dict(vote_counts),
-            'model_predictions': probabilities,
-            'consensus': len(set(predictions.values())) == 1  # Tous d'accord?
-        }
+        return results
     
     def predict_top_n(self, symptoms_text, n=3):
         """
@@ -280,13 +721,16 @@ class DiseasePredictor:
         if not self.is_trained:
             raise Exception("Modèle non entraîné")
         
-        X = self.vectorizer.transform([symptoms_text])
+        X = self._transform_cached(symptoms_text)[1]
         
         # Utiliser le modèle le plus performant (Random Forest)
         model = self.models['random_forest']
         
         probas = model.predict_proba(X)[0]
-        top_indices = np.argsort(probas)[-n:][::-1]
+        # Sélection partielle des N meilleures (O(k)), seul ce sous-ensemble est trié
+        n = min(n, probas.size)
+        top_indices = np.argpartition(probas, -n)[-n:]
+        top_indices = top_indices[np.argsort(-probas[top_indices])]
         
         results = []
         for idx in top_indices:
@@ -305,7 +749,7 @@ class DiseasePredictor:
         Calcule l'importance des features avec Random Forest
         """
         rf_model = self.models['random_forest']
-        feature_names = self.vectorizer.get_feature_names_out()
+        feature_names = self._feature_names
         importances = rf_model.feature_importances_
         
         # Top 20 features
@@ -315,6 +759,7 @@ class DiseasePredictor:
             feature_names[i]: float(importances[i])
             for i in top_indices
         }
+        self._importance_vec = self._importance_vector()
         
         print(f"\nTop 10 symptômes importants:")
         for i, (feature, importance) in enumerate(list(self.feature_importance.items())[:10], 1):
@@ -332,15 +777,20 @@ class DiseasePredictor:
             'timestamp': datetime.now().isoformat()
         }
         
-        with open(filepath, 'wb') as f:
-            pickle.dump(model_data, f)
+        # joblib (même nom de fichier, .pkl ou .joblib) : tableaux numpy des
+        # arbres écrits à part et compressés
+        joblib.dump(model_data, filepath, compress=MODEL_COMPRESS)
         
         print(f"Modèle sauvegardé: {filepath}")
     
     def load_model(self, filepath='models/disease_model.pkl'):
-        """Charge les modèles sauvegardés"""
-        with open(filepath, 'rb') as f:
-            model_data = pickle.load(f)
+        """Charge les modèles sauvegardés (joblib, ou pickle des anciennes versions)"""
+        model_data = joblib.load(filepath)
+        
+        # Les anciens fichiers (TfidfVectorizer seul) ne fournissent pas les
+        # comptages attendus par COUNT_FEATURE_MODELS : réentraîner
+        if not isinstance(model_data['vectorizer'], (_InPlaceTfidfVectorizer, _HashingTfidfVectorizer)):
+            raise ValueError(f"Format de modèle obsolète: {filepath}")
         
         self.models = model_data['models']
         self.vectorizer = model_data['vectorizer']
@@ -348,6 +798,8 @@ class DiseasePredictor:
         self.is_trained = model_data['is_trained']
         self.training_history = model_data.get('training_history', [])
         self.feature_importance = model_data.get('feature_importance', {})
+        self._vectorizer_changed()
+        self._importance_vec = self._importance_vector()
         
         print(f"Modèle chargé: {filepath}")
         print(f"   Dernière formation: {self.training_history[-1]['timestamp'] if self.training_history else 'N/A'}")
@@ -361,7 +813,7 @@ class DiseasePredictor:
             'status': 'trained',
             'models': list(self.models.keys()),
             'diseases': list(self.label_encoder.classes_),
-            'n_features': len(self.vectorizer.get_feature_names_out()),
+            'n_features': len(self._feature_names),
             'training_history': self.training_history,
             'top_features': list(self.feature_importance.items())[:10]
         }
@@ -370,28 +822,28 @@ class DiseasePredictor:
         """
         Explique pourquoi cette maladie a été prédite
         """
-        X = self.vectorizer.transform([symptoms_text])
-        feature_names = np.array(self.vectorizer.get_feature_names_out())
+        X = self._transform_cached(symptoms_text)[1]
+        feature_names = self._feature_names
         
-        # Récupérer les features actives
-        active_features_indices = X.toarray()[0].nonzero()[0]
-        active_features = feature_names[active_features_indices]
-        active_values = X.toarray()[0][active_features_indices]
+        # Récupérer les features actives, directement depuis la ligne CSR
+        # (sans densification) ; sorted_indices copie : X vient du cache
+        if not X.has_sorted_indices:
+            X = X.sorted_indices()
+        active_features_indices = X.indices
         
-        # Trier par importance
-        feature_importance_pairs = [
-            (feat, val, self.feature_importance.get(feat, 0))
-            for feat, val in zip(active_features, active_values)
-        ]
-        feature_importance_pairs.sort(key=lambda x: x[2], reverse=True)
+        # Trier par importance (tri stable : à égalité, ordre des colonnes)
+        importances = self._importance_vec[active_features_indices]
+        top = np.argsort(-importances, kind='stable')[:5]
         
         explanation = {
             'predicted_disease': predicted_disease,
             'key_symptoms_detected': [
-                {'symptom': feat, 'weight': round(val, 3), 'importance': round(imp, 4)}
-                for feat, val, imp in feature_importance_pairs[:5]
+                {'symptom': feature_names[active_features_indices[k]],
+                 'weight': round(float(X.data[k]), 3),
+                 'importance': round(float(importances[k]), 4)}
+                for k in top
             ],
-            'total_features_used': len(active_features)
+            'total_features_used': len(active_features_indices)
         }
         
         return explanation
@@ -408,13 +860,9 @@ def evaluate_model_performance(predictor, test_data):
     if not predictor.is_trained:
         return {'error': 'Model not trained'}
     
-    true_labels = []
-    predictions = []
-    
-    for symptoms, true_disease in test_data:
-        pred = predictor.predict(symptoms)
-        predictions.append(pred['predicted_disease'])
-        true_labels.append(true_disease)
+    symptoms_texts = [symptoms for symptoms, _ in test_data]
+    true_labels = [true_disease for _, true_disease in test_data]
+    predictions = [pred['predicted_disease'] for pred in predictor.predict_batch(symptoms_texts)]
     
     from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
     
@@ -1,7 +1,176 @@
 from datetime import datetime, timedelta
 from collections import Counter
+from operator import itemgetter
+from bisect import bisect_right
+import heapq
 import json
 
+# Distingue une clé absente d'une valeur None dans dict.get
+_MISSING = object()
+
+# Niveaux de risque, indexés par _risk_scores : nombre de seuils atteints
+# par le score (< 40 faible, < 70 moyen, au-delà élevé)
+_RISK_THRESHOLDS = (40, 70)
+_RISK_LABELS = ('low', 'medium', 'high')
+
+# Multiplicateurs de risque : âge (bornes < 18, < 40, < 60, au-delà) et style de vie
+_AGE_BOUNDS = (18, 40, 60)
+_AGE_MUL = (0.8, 1.0, 1.2, 1.5)
+_LIFESTYLE_MUL = {
+    'very_active': 0.8,
+    'active': 1.0,
+    'sedentary': 1.3
+}
+
+# Recommandations par maladie et niveau de risque (tuples partagés entre appels)
+_RECOMMENDATIONS = {
+    'grippe': {
+        'high': (
+            "Vaccination antigrippale annuelle fortement recommandée",
+            "Consultation médicale pour évaluer le système immunitaire",
+            "Renforcer les mesures d'hygiène (lavage des mains)",
+            "Éviter les lieux publics en période épidémique",
+        ),
+        'medium': (
+            "Envisager la vaccination antigrippale",
+            "Repos adéquat et alimentation équilibrée",
+            "Hygiène des mains régulière",
+        ),
+        'low': (
+            "Maintenir une bonne hygiène de vie",
+            "Vaccination si personne à risque",
+        )
+    },
+    'allergie': {
+        'high': (
+            "Consultation allergologue pour tests cutanés",
+            "Traitement de désensibilisation possible",
+            "Éviction stricte des allergènes identifiés",
+            "Avoir un plan d'action d'urgence",
+        ),
+        'medium': (
+            "Identifier les allergènes déclencheurs",
+            "Antihistaminiques préventifs si nécessaire",
+            "Aération régulière du domicile",
+        ),
+        'low': (
+            "Surveiller les symptômes saisonniers",
+            "Antihistaminiques occasionnels",
+        )
+    },
+    'migraine': {
+        'high': (
+            "Consultation neurologique recommandée",
+            "Tenir un journal des migraines (déclencheurs)",
+            "Traitement de fond à envisager",
+            "Éviter les facteurs déclenchants connus",
+        ),
+        'medium': (
+            "Identifier les déclencheurs (stress, aliments)",
+            "Traitement préventif si crises fréquentes",
+            "Techniques de relaxation",
+        ),
+        'low': (
+            "Gérer le stress",
+            "Antalgiques dès les premiers signes",
+        )
+    }
+}
+
+# Recommandations des maladies sans entrée dédiée
+_DEFAULT_RECOMMENDATIONS = {
+    'high': (
+        "Consultation médicale recommandée",
+        "Suivi régulier nécessaire",
+        "Maintenir un mode de vie sain",
+    ),
+    'medium': (
+        "Surveillance des symptômes",
+        "Consultation si aggravation",
+    ),
+    'low': (
+        "Prévention et hygiène de vie",
+    )
+}
+
+# Prédiction de repli quand seuls des symptômes reviennent : copiée puis
+# complétée (occurrences, symptôme en tête des recommandations) à chaque appel
+_CHRONIC_TEMPLATE = {
+    'disease': 'condition_chronique',
+    'risk_score': 50.0,
+    'risk_level': 'medium',
+    'occurrences': 0,
+    'recommendations': (
+        "Consultation médicale recommandée pour bilan",
+        "Tenir un journal des symptômes",
+        "Identifier les facteurs déclenchants",
+    )
+}
+
+def _recurring_and_top(counts, threshold, top_n):
+    """
+    Entrées de counts vues au moins threshold fois, et les top_n plus
+    fréquentes dans l'ordre de Counter.most_common(top_n)
+    """
+    recurring = {key: count for key, count in counts.items() if count >= threshold}
+    if len(counts) > top_n:
+        top = heapq.nlargest(top_n, counts.items(), key=itemgetter(1))
+    else:
+        # Tri stable : à égalité, ordre de première apparition comme most_common
+        top = sorted(counts.items(), key=itemgetter(1), reverse=True)
+    return recurring, top
+
+
+def _partition_by_risk_level(predictions):
+    """Prédictions réparties par niveau de risque en un seul passage, ordre conservé"""
+    buckets = {label: [] for label in _RISK_LABELS}
+    for pred in predictions:
+        buckets[pred['risk_level']].append(pred)
+    return buckets
+
+
+def _risk_scores(counts, total, age_multiplier, lifestyle_multiplier):
+    """
+    Scores de risque (non bornés) et indices de _RISK_LABELS pour chaque
+    nombre d'occurrences de counts, dans l'ordre
+    """
+    risks = [(count / total) * 100 * age_multiplier * lifestyle_multiplier for count in counts]
+    # Comparaisons enchaînées : plus rapides en CPython qu'un bisect_right par score
+    medium, high = _RISK_THRESHOLDS
+    levels = [2 if risk >= high else 1 if risk >= medium else 0 for risk in risks]
+    return risks, levels
+
+
+class HistoryAnalysis:
+    """
+    Résultat de analyze_consultation_history, transmis tel quel à
+    calculate_disease_risk : attributs à slots plutôt qu'un dict relu clé
+    par clé à chaque étape. to_dict() pour le JSON et MongoDB.
+    """
+    __slots__ = ('sufficient_data', 'total_consultations', 'unique_symptoms', 'unique_diseases',
+                 'recurring_symptoms', 'recurring_diseases', 'avg_consultation_frequency',
+                 'most_common_symptoms', 'most_common_diseases')
+    
+    def __init__(self, total_consultations, sufficient_data=True, unique_symptoms=0,
+                 unique_diseases=0, recurring_symptoms=None, recurring_diseases=None,
+                 avg_consultation_frequency=0, most_common_symptoms=(), most_common_diseases=()):
+        self.sufficient_data = sufficient_data
+        self.total_consultations = total_consultations
+        self.unique_symptoms = unique_symptoms
+        self.unique_diseases = unique_diseases
+        self.recurring_symptoms = {} if recurring_symptoms is None else recurring_symptoms
+        self.recurring_diseases = {} if recurring_diseases is None else recurring_diseases
+        self.avg_consultation_frequency = avg_consultation_frequency
+        self.most_common_symptoms = most_common_symptoms
+        self.most_common_diseases = most_common_diseases
+    
+    def to_dict(self):
+        """Forme dict historique (deux clés seulement si les données sont insuffisantes)"""
+        if not self.sufficient_data:
+            return {'sufficient_data': False, 'total_consultations': self.total_consultations}
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
 class PredictiveHealthAnalyzer:
     """
     Analyseur prédictif de santé basé sur l'historique des consultations
@@ -21,102 +190,121 @@ class PredictiveHealthAnalyzer:
     def analyze_consultation_history(self, consultations):
         """
         Analyse l'historique des consultations pour identifier les patterns
+        
+        Returns:
+            HistoryAnalysis
         """
         if not consultations or len(consultations) < 2:
-            return {
-                'sufficient_data': False,
-                'total_consultations': len(consultations)
-            }
+            return HistoryAnalysis(len(consultations), sufficient_data=False)
         
-        # Extraire les symptômes de toutes les consultations
+        # Extraire symptômes, maladies et dates en un seul passage ; méthodes
+        # liées localement (pas de résolution d'attribut par consultation).
+        # Des dates, seules la première, la dernière et le nombre servent
         all_symptoms = []
         all_diseases = []
-        dates = []
+        n_dates = 0
+        first_date = last_date = None
+        add_symptoms = all_symptoms.extend
+        add_disease = all_diseases.append
+        parse_date = datetime.fromisoformat
         
         for consultation in consultations:
-            if 'symptoms' in consultation and consultation['symptoms']:
-                all_symptoms.extend(consultation['symptoms'])
+            symptoms = consultation.get('symptoms')
+            if symptoms:
+                add_symptoms(symptoms)
             
-            if 'diagnosis' in consultation and consultation['diagnosis']:
-                for diag in consultation['diagnosis']:
-                    all_diseases.append(diag['disease'])
+            diagnosis = consultation.get('diagnosis')
+            if diagnosis:
+                for diag in diagnosis:
+                    add_disease(diag['disease'])
             
-            if 'timestamp' in consultation:
-                timestamp = consultation['timestamp']
+            timestamp = consultation.get('timestamp', _MISSING)
+            if timestamp is not _MISSING:
                 if isinstance(timestamp, str):
-                    timestamp = datetime.fromisoformat(timestamp)
-                dates.append(timestamp)
+                    timestamp = parse_date(timestamp)
+                if n_dates == 0:
+                    first_date = last_date = timestamp
+                elif timestamp < first_date:
+                    first_date = timestamp
+                elif timestamp > last_date:
+                    last_date = timestamp
+                n_dates += 1
         
         # Compter les occurrences
         symptom_counts = Counter(all_symptoms)
         disease_counts = Counter(all_diseases)
         
         # Calculer la fréquence de consultation
-        if len(dates) > 1:
-            dates_sorted = sorted(dates)
-            time_span = (dates_sorted[-1] - dates_sorted[0]).days
-            avg_frequency = time_span / len(dates) if len(dates) > 0 else 0
+        if n_dates > 1:
+            time_span = (last_date - first_date).days
+            avg_frequency = time_span / n_dates
         else:
             avg_frequency = 0
         
-        # Identifier les symptômes récurrents
-        recurring_symptoms = {
-            symptom: count 
-            for symptom, count in symptom_counts.items() 
-            if count >= self.risk_factors['recurring_threshold']
-        }
-        
-        # Identifier les maladies récurrentes
-        recurring_diseases = {
-            disease: count 
-            for disease, count in disease_counts.items() 
-            if count >= self.risk_factors['recurring_threshold']
-        }
-        
-        return {
-            'sufficient_data': True,
-            'total_consultations': len(consultations),
-            'unique_symptoms': len(symptom_counts),
-            'unique_diseases': len(disease_counts),
-            'recurring_symptoms': recurring_symptoms,
-            'recurring_diseases': recurring_diseases,
-            'avg_consultation_frequency': avg_frequency,
-            'most_common_symptoms': symptom_counts.most_common(5),
-            'most_common_diseases': disease_counts.most_common(3)
-        }
+        # Symptômes et maladies récurrents, et les plus fréquents
+        threshold = self.risk_factors['recurring_threshold']
+        recurring_symptoms, top_symptoms = _recurring_and_top(symptom_counts, threshold, 5)
+        recurring_diseases, top_diseases = _recurring_and_top(disease_counts, threshold, 3)
+        
+        return HistoryAnalysis(
+            len(consultations),
+            unique_symptoms=len(symptom_counts),
+            unique_diseases=len(disease_counts),
+            recurring_symptoms=recurring_symptoms,
+            recurring_diseases=recurring_diseases,
+            avg_consultation_frequency=avg_frequency,
+            most_common_symptoms=top_symptoms,
+            most_common_diseases=top_diseases
+        )
     
     def calculate_disease_risk(self, user_data, history_analysis):
         """
         Calcule le risque de développer certaines maladies
+        
+        history_analysis: HistoryAnalysis de analyze_consultation_history
         """
+        recurring_diseases = history_analysis.recurring_diseases
+        recurring_symptoms = history_analysis.recurring_symptoms
+        total = history_analysis.total_consultations
+        
+        # Rien de récurrent : aucun facteur de risque à calculer
+        if not total or not (recurring_diseases or recurring_symptoms):
+            return []
+        
         predictions = []
         
+        if not recurring_diseases:
+            # Pas de maladies récurrentes mais des symptômes récurrents
+            # Le premier des plus fréquents à égalité, comme most_common(1)
+            most_common_symptom = max(recurring_symptoms.items(), key=itemgetter(1))
+            
+            prediction = _CHRONIC_TEMPLATE.copy()
+            prediction['occurrences'] = most_common_symptom[1]
+            prediction['recommendations'] = (
+                (f"Symptôme récurrent détecté: {most_common_symptom[0]}",)
+                + _CHRONIC_TEMPLATE['recommendations']
+            )
+            predictions.append(prediction)
+            return predictions
+        
         # Facteurs de risque basés sur l'âge
         age = user_data.get('age', 30)
-        age_risk_multiplier = self._get_age_risk_multiplier(age)
+        age_risk_multiplier = _AGE_MUL[bisect_right(_AGE_BOUNDS, age)]
         
         # Facteurs de risque basés sur le style de vie
         lifestyle = user_data.get('lifestyle', 'active')
-        lifestyle_risk_multiplier = self._get_lifestyle_risk_multiplier(lifestyle)
+        lifestyle_risk_multiplier = _LIFESTYLE_MUL.get(lifestyle, 1.0)
         
-        # Analyser les maladies récurrentes
-        recurring_diseases = history_analysis.get('recurring_diseases', {})
+        # Scores de risque et niveaux de toutes les maladies en un bloc
+        adjusted_risks, levels = _risk_scores(
+            recurring_diseases.values(), total,
+            age_risk_multiplier, lifestyle_risk_multiplier
+        )
         
-        for disease, count in recurring_diseases.items():
-            # Calculer le score de risque
-            base_risk = (count / history_analysis['total_consultations']) * 100
-            adjusted_risk = base_risk * age_risk_multiplier * lifestyle_risk_multiplier
-            
+        for (disease, count), adjusted_risk, level in zip(recurring_diseases.items(), adjusted_risks, levels):
             # Limiter entre 0 et 100
             risk_score = min(100, max(0, adjusted_risk))
-            
-            # Déterminer le niveau de risque
-            if risk_score >= 70:
-                risk_level = 'high'
-            elif risk_score >= 40:
-                risk_level = 'medium'
-            else:
-                risk_level = 'low'
+            risk_level = _RISK_LABELS[level]
             
             predictions.append({
                 'disease': disease,
@@ -126,124 +314,15 @@ class PredictiveHealthAnalyzer:
                 'recommendations': self._get_recommendations(disease, risk_level)
             })
         
-        # Analyser les symptômes récurrents
-        recurring_symptoms = history_analysis.get('recurring_symptoms', {})
-        
-        if recurring_symptoms and not predictions:
-            # Si pas de maladies récurrentes mais des symptômes récurrents
-            most_common_symptom = max(recurring_symptoms.items(), key=lambda x: x[1])
-            
-            predictions.append({
-                'disease': 'condition_chronique',
-                'risk_score': 50.0,
-                'risk_level': 'medium',
-                'occurrences': most_common_symptom[1],
-                'recommendations': [
-                    f"Symptôme récurrent détecté: {most_common_symptom[0]}",
-                    "Consultation médicale recommandée pour bilan",
-                    "Tenir un journal des symptômes",
-                    "Identifier les facteurs déclenchants"
-                ]
-            })
-        
         # Trier par score de risque décroissant
-        predictions.sort(key=lambda x: x['risk_score'], reverse=True)
+        predictions.sort(key=itemgetter('risk_score'), reverse=True)
         
         return predictions
     
-    def _get_age_risk_multiplier(self, age):
-        """Retourne un multiplicateur de risque basé sur l'âge"""
-        if age < 18:
-            return 0.8
-        elif age < 40:
-            return 1.0
-        elif age < 60:
-            return 1.2
-        else:
-            return 1.5
-    
-    def _get_lifestyle_risk_multiplier(self, lifestyle):
-        """Retourne un multiplicateur de risque basé sur le style de vie"""
-        lifestyle_map = {
-            'very_active': 0.8,
-            'active': 1.0,
-            'sedentary': 1.3
-        }
-        return lifestyle_map.get(lifestyle, 1.0)
-    
     def _get_recommendations(self, disease, risk_level):
         """Génère des recommandations basées sur la maladie et le niveau de risque"""
-        recommendations_map = {
-            'grippe': {
-                'high': [
-                    "Vaccination antigrippale annuelle fortement recommandée",
-                    "Consultation médicale pour évaluer le système immunitaire",
-                    "Renforcer les mesures d'hygiène (lavage des mains)",
-                    "Éviter les lieux publics en période épidémique"
-                ],
-                'medium': [
-                    "Envisager la vaccination antigrippale",
-                    "Repos adéquat et alimentation équilibrée",
-                    "Hygiène des mains régulière"
-                ],
-                'low': [
-                    "Maintenir une bonne hygiène de vie",
-                    "Vaccination si personne à risque"
-                ]
-            },
-            'allergie': {
-                'high': [
-                    "Consultation allergologue pour tests cutanés",
-                    "Traitement de désensibilisation possible",
-                    "Éviction stricte des allergènes identifiés",
-                    "Avoir un plan d'action d'urgence"
-                ],
-                'medium': [
-                    "Identifier les allergènes déclencheurs",
-                    "Antihistaminiques préventifs si nécessaire",
-                    "Aération régulière du domicile"
-                ],
-                'low': [
-                    "Surveiller les symptômes saisonniers",
-                    "Antihistaminiques occasionnels"
-                ]
-            },
-            'migraine': {
-                'high': [
-                    "Consultation neurologique recommandée",
-                    "Tenir un journal des migraines (déclencheurs)",
-                    "Traitement de fond à envisager",
-                    "Éviter les facteurs déclenchants connus"
-                ],
-                'medium': [
-                    "Identifier les déclencheurs (stress, aliments)",
-                    "Traitement préventif si crises fréquentes",
-                    "Techniques de relaxation"
-                ],
-                'low': [
-                    "Gérer le stress",
-                    "Antalgiques dès les premiers signes"
-                ]
-            }
-        }
-        
-        default_recommendations = {
-            'high': [
-                "Consultation médicale recommandée",
-                "Suivi régulier nécessaire",
-                "Maintenir un mode de vie sain"
-            ],
-            'medium': [
-                "Surveillance des symptômes",
-                "Consultation si aggravation"
-            ],
-            'low': [
-                "Prévention et hygiène de vie"
-            ]
-        }
-        
-        disease_recs = recommendations_map.get(disease, default_recommendations)
-        return disease_recs.get(risk_level, default_recommendations['medium'])
+        disease_recs = _RECOMMENDATIONS.get(disease, _DEFAULT_RECOMMENDATIONS)
+        return disease_recs.get(risk_level, _DEFAULT_RECOMMENDATIONS['medium'])
     
     def generate_prediction_report(self, predictions, user_data):
         """
@@ -255,65 +334,64 @@ class PredictiveHealthAnalyzer:
                 'message': "Aucune prédiction de risque identifiée pour le moment."
             }
         
-        report = "ANALYSE PRÉDICTIVE DE SANTÉ\n"
-        report += "="*40 + "\n\n"
+        # Morceaux du rapport joints une seule fois à la fin
+        parts = []
+        append = parts.append
+        append("ANALYSE PRÉDICTIVE DE SANTÉ\n" + "="*40 + "\n\n")
         
         # Informations utilisateur
         age = user_data.get('age', 'Non spécifié')
         lifestyle = user_data.get('lifestyle', 'Non spécifié')
         
-        report += f"Profil:\n"
-        report += f"   Age: {age}\n"
-        report += f"   Style de vie: {lifestyle}\n"
-        report += f"   Consultations analysées: {user_data.get('total_consultations', 0)}\n\n"
+        append(f"Profil:\n"
+               f"   Age: {age}\n"
+               f"   Style de vie: {lifestyle}\n"
+               f"   Consultations analysées: {user_data.get('total_consultations', 0)}\n\n")
         
         # Risques identifiés
-        report += "RISQUES IDENTIFIÉS:\n\n"
+        append("RISQUES IDENTIFIÉS:\n\n")
         
-        high_risks = [p for p in predictions if p['risk_level'] == 'high']
-        medium_risks = [p for p in predictions if p['risk_level'] == 'medium']
-        low_risks = [p for p in predictions if p['risk_level'] == 'low']
+        buckets = _partition_by_risk_level(predictions)
+        high_risks = buckets['high']
+        medium_risks = buckets['medium']
+        low_risks = buckets['low']
         
         if high_risks:
-            report += "PRIORITÉ ÉLEVÉE:\n"
+            append("PRIORITÉ ÉLEVÉE:\n")
             for pred in high_risks:
-                report += f"   • {pred['disease'].upper()}\n"
-                report += f"     Score de risque: {pred['risk_score']}%\n"
-                report += f"     Occurrences: {pred['occurrences']}\n"
+                append(f"   • {pred['disease'].upper()}\n"
+                       f"     Score de risque: {pred['risk_score']}%\n"
+                       f"     Occurrences: {pred['occurrences']}\n")
         
         if medium_risks:
-            report += "\nPRIORITÉ MOYENNE:\n"
+            append("\nPRIORITÉ MOYENNE:\n")
             for pred in medium_risks:
-                report += f"   • {pred['disease'].capitalize()}\n"
-                report += f"     Score de risque: {pred['risk_score']}%\n"
+                append(f"   • {pred['disease'].capitalize()}\n"
+                       f"     Score de risque: {pred['risk_score']}%\n")
         
         if low_risks:
-            report += "\nRISQUE FAIBLE:\n"
+            append("\nRISQUE FAIBLE:\n")
             for pred in low_risks:
-                report += f"   • {pred['disease'].capitalize()} ({pred['risk_score']}%)\n"
+                append(f"   • {pred['disease'].capitalize()} ({pred['risk_score']}%)\n")
         
         # Recommandations principales
-        report += "\n" + "="*40 + "\n"
-        report += "RECOMMANDATIONS PRINCIPALES:\n\n"
+        append("\n" + "="*40 + "\n"
+               "RECOMMANDATIONS PRINCIPALES:\n\n")
         
         if high_risks:
             top_risk = high_risks[0]
-            report += f"Pour {top_risk['disease']}:\n"
+            append(f"Pour {top_risk['disease']}:\n")
             for i, rec in enumerate(top_risk['recommendations'], 1):
-                report += f"   {i}. {rec}\n"
+                append(f"   {i}. {rec}\n")
         
-        report += "\n" + "="*40 + "\n"
-        report += "AVERTISSEMENT:\n"
-        report += "Cette analyse est basée sur votre historique et des facteurs généraux.\n"
-        report += "Elle ne remplace pas un avis médical professionnel.\n"
+        append("\n" + "="*40 + "\n"
+               "AVERTISSEMENT:\n"
+               "Cette analyse est basée sur votre historique et des facteurs généraux.\n"
+               "Elle ne remplace pas un avis médical professionnel.\n")
+        report = "".join(parts)
         
         # Déterminer le niveau de priorité global
-        if high_risks:
-            priority_level = 'high'
-        elif medium_risks:
-            priority_level = 'medium'
-        else:
-            priority_level = 'low'
+        priority_level = 'high' if high_risks else 'medium' if medium_risks else 'low'
         
         return {
             'has_predictions': True,
@@ -328,8 +406,9 @@ class PredictiveHealthAnalyzer:
         if not predictions:
             return "Prochain contrôle: Dans 6 mois pour un bilan de routine"
         
-        high_risks = [p for p in predictions if p['risk_level'] == 'high']
-        medium_risks = [p for p in predictions if p['risk_level'] == 'medium']
+        buckets = _partition_by_risk_level(predictions)
+        high_risks = buckets['high']
+        medium_risks = buckets['medium']
         
         if high_risks:
             return "Prochain contrôle: URGENT - Consultation médicale dans les 2 semaines"
@@ -0,0 +1,71 @@
+"""
+Cache des réponses de /api/chat : seule une réponse obtenue de l'API est
+rejouée ; une réponse de secours (API en échec) ne l'est pas, le prochain
+envoi retente l'API
+"""
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'models'))
+sys.path.insert(0, BACKEND_DIR)
+
+import app
+from conversational_agent import ConversationalAgent
+
+
+class FakeOpenAIClient:
+    """client.chat.completions.create : échoue `failures` fois, puis répond"""
+    
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+    
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("API indisponible")
+        message = SimpleNamespace(content="Bonjour ! Comment puis-je vous aider ?")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@unittest.skipIf(app.TTLCache is None, "cachetools non installé")
+class ChatCacheTest(unittest.TestCase):
+    
+    def setUp(self):
+        # Pas de préchargement du modèle ML : inutile pour ces messages
+        self._saved = (app._preload_started, app.conversational_agent._instance)
+        app._preload_started = True
+        self.agent = ConversationalAgent()
+        app.conversational_agent.replace(self.agent)
+        app.clear_reply_cache()
+        self.client = app.app.test_client()
+    
+    def tearDown(self):
+        app._preload_started = self._saved[0]
+        app.conversational_agent.replace(self._saved[1])
+        app.clear_reply_cache()
+    
+    def _send(self, message='Bonjour'):
+        return self.client.post('/api/chat', json={'message': message, 'user_id': 'cache-test'}).get_json()
+    
+    def test_api_reply_is_replayed(self):
+        self.agent.client = FakeOpenAIClient()
+        first = self._send()
+        second = self._send()
+        self.assertEqual(first, second)
+        self.assertEqual(self.agent.client.calls, 1)
+    
+    def test_fallback_reply_is_not_cached(self):
+        self.agent.client = FakeOpenAIClient(failures=1)
+        self._send()
+        reply = self._send()
+        self.assertEqual(self.agent.client.calls, 2)
+        self.assertEqual(reply['message'], "Bonjour ! Comment puis-je vous aider ?")
+
+
+if __name__ == '__main__':
+    unittest.main()
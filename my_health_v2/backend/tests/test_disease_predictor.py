@@ -0,0 +1,104 @@
+"""
+Vote de l'ensemble : _vote et predict_batch doivent donner le résultat du
+predict d'origine (un predict par modèle, Counter.most_common, np.mean des
+confiances des modèles gagnants)
+"""
+import os
+import sys
+import unittest
+from collections import Counter
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'models'))
+
+from disease_predictor import DiseasePredictor, _model_input, _vote
+
+
+TEXTS = (
+    'fièvre toux fatigue courbatures',
+    'nez bouché éternuements mal de gorge',
+    'diarrhée vomissements crampes abdominales',
+    'maux de tête sensibilité lumière nausées',
+    'toux grasse expectorations fièvre',
+    'douleur faciale nez bouché pression',
+    'yeux rouges démangeaisons éternuements',
+    'mal de gorge intense fièvre ganglions',
+    'symptômes inconnus',
+)
+
+
+def _baseline_vote(model_preds, model_confidences):
+    """Vote d'origine pour un texte : (gagnant, confiance moyenne, votes, consensus)"""
+    vote_counts = Counter(model_preds)
+    winner = vote_counts.most_common(1)[0][0]
+    avg_confidence = np.mean([c for p, c in zip(model_preds, model_confidences) if p == winner])
+    return winner, avg_confidence, dict(vote_counts), len(set(model_preds)) == 1
+
+
+class VoteTest(unittest.TestCase):
+    
+    def test_matches_counter_most_common(self):
+        rng = np.random.default_rng(0)
+        for n_classes in (2, 3, 8):
+            # Peu de classes pour 4 modèles : beaucoup d'égalités 2-2
+            preds = rng.integers(0, n_classes, size=(4, 500))
+            confidences = rng.uniform(10, 100, size=(4, 500))
+            winners, avg_confidences, consensus, counts = _vote(preds, confidences, n_classes)
+            for j in range(preds.shape[1]):
+                with self.subTest(n_classes=n_classes, j=j):
+                    winner, avg_confidence, votes, agree = _baseline_vote(list(preds[:, j]),
+                                                                          list(confidences[:, j]))
+                    self.assertEqual(winners[j], winner)
+                    self.assertAlmostEqual(avg_confidences[j], avg_confidence, places=9)
+                    self.assertEqual(consensus[j], agree)
+                    self.assertEqual({c: int(counts[j, c]) for c in votes}, votes)
+                    self.assertEqual(counts[j].sum(), preds.shape[0])
+
+
+class PredictBatchTest(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.predictor = DiseasePredictor()
+        cls.predictor.train()
+    
+    def test_predict_matches_baseline(self):
+        predictor = self.predictor
+        classes = predictor.label_encoder.classes_
+        for text in TEXTS:
+            with self.subTest(text=text):
+                counts, X = predictor.vectorizer.transform_with_counts([text])
+                model_predictions = {}
+                for name, model in predictor.models.items():
+                    model_input = _model_input(name, counts, X)
+                    model_predictions[name] = {
+                        'disease': classes[model.predict(model_input)[0]],
+                        'confidence': float(np.max(model.predict_proba(model_input)[0]) * 100)
+                    }
+                winner, avg_confidence, votes, agree = _baseline_vote(
+                    [p['disease'] for p in model_predictions.values()],
+                    [p['confidence'] for p in model_predictions.values()]
+                )
+                
+                # Confiances à la précision float32 du TF-IDF près (float64 à l'origine)
+                result = predictor.predict(text)
+                self.assertEqual(result['predicted_disease'], winner)
+                self.assertAlmostEqual(result['confidence'], round(avg_confidence, 2), delta=0.01)
+                self.assertEqual(result['voting_details'], votes)
+                self.assertEqual(list(result['voting_details']), list(votes))
+                self.assertEqual(list(result['model_predictions']), list(model_predictions))
+                for name, expected in model_predictions.items():
+                    self.assertEqual(result['model_predictions'][name]['disease'], expected['disease'])
+                    self.assertAlmostEqual(result['model_predictions'][name]['confidence'],
+                                           expected['confidence'], places=4)
+                self.assertEqual(result['consensus'], agree)
+    
+    def test_predict_batch_matches_predict(self):
+        self.assertEqual(self.predictor.predict_batch(list(TEXTS)),
+                         [self.predictor.predict(text) for text in TEXTS])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Analyse de l'historique : HistoryAnalysis.to_dict() doit reproduire le dict
+que retournait analyze_consultation_history à l'origine
+"""
+import os
+import random
+import sys
+import unittest
+from collections import Counter
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'models'))
+
+from predictive_health_analyzer import HistoryAnalysis, PredictiveHealthAnalyzer
+
+
+SYMPTOMS = ('fièvre', 'toux', 'fatigue', 'maux de tête', 'nausées', 'éternuements', 'frissons')
+DISEASES = ('grippe', 'rhume', 'migraine', 'allergie', 'angine')
+START = datetime(2024, 1, 1, 8, 30)
+
+
+def _baseline_analysis(consultations, recurring_threshold):
+    """analyze_consultation_history d'origine"""
+    if not consultations or len(consultations) < 2:
+        return {
+            'sufficient_data': False,
+            'total_consultations': len(consultations)
+        }
+    
+    all_symptoms = []
+    all_diseases = []
+    dates = []
+    
+    for consultation in consultations:
+        if 'symptoms' in consultation and consultation['symptoms']:
+            all_symptoms.extend(consultation['symptoms'])
+        
+        if 'diagnosis' in consultation and consultation['diagnosis']:
+            for diag in consultation['diagnosis']:
+                all_diseases.append(diag['disease'])
+        
+        if 'timestamp' in consultation:
+            timestamp = consultation['timestamp']
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp)
+            dates.append(timestamp)
+    
+    symptom_counts = Counter(all_symptoms)
+    disease_counts = Counter(all_diseases)
+    
+    if len(dates) > 1:
+        dates_sorted = sorted(dates)
+        time_span = (dates_sorted[-1] - dates_sorted[0]).days
+        avg_frequency = time_span / len(dates) if len(dates) > 0 else 0
+    else:
+        avg_frequency = 0
+    
+    return {
+        'sufficient_data': True,
+        'total_consultations': len(consultations),
+        'unique_symptoms': len(symptom_counts),
+        'unique_diseases': len(disease_counts),
+        'recurring_symptoms': {s: c for s, c in symptom_counts.items() if c >= recurring_threshold},
+        'recurring_diseases': {d: c for d, c in disease_counts.items() if c >= recurring_threshold},
+        'avg_consultation_frequency': avg_frequency,
+        'most_common_symptoms': symptom_counts.most_common(5),
+        'most_common_diseases': disease_counts.most_common(3)
+    }
+
+
+def random_history(rng, n_consultations, timestamp_kind='datetime'):
+    """
+    Historique aléatoire : symptômes et maladies tirés d'un petit vocabulaire
+    (récurrences et égalités fréquentes), champs parfois absents ou vides.
+    timestamp_kind : 'datetime', 'str' (ISO 8601) ou 'mixed'
+    """
+    consultations = []
+    for _ in range(n_consultations):
+        consultation = {}
+        if rng.random() < 0.9:
+            consultation['symptoms'] = rng.sample(SYMPTOMS, rng.randint(0, 4))
+        if rng.random() < 0.8:
+            consultation['diagnosis'] = [{'disease': d, 'confidence': 50.0}
+                                         for d in rng.sample(DISEASES, rng.randint(0, 2))]
+        if rng.random() < 0.95:
+            timestamp = START + timedelta(minutes=rng.randint(0, 400 * 24 * 60))
+            if timestamp_kind == 'str' or (timestamp_kind == 'mixed' and rng.random() < 0.5):
+                timestamp = timestamp.isoformat()
+            consultation['timestamp'] = timestamp
+        consultations.append(consultation)
+    return consultations
+
+
+class HistoryAnalysisTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.analyzer = PredictiveHealthAnalyzer()
+        self.threshold = self.analyzer.risk_factors['recurring_threshold']
+    
+    def assertMatchesBaseline(self, consultations):
+        analysis = self.analyzer.analyze_consultation_history(consultations)
+        self.assertIsInstance(analysis, HistoryAnalysis)
+        expected = _baseline_analysis(consultations, self.threshold)
+        self.assertEqual(analysis.to_dict(), expected)
+        # Même ordre de clés que le dict d'origine (JSON, MongoDB)
+        self.assertEqual(list(analysis.to_dict()), list(expected))
+        for name, value in expected.items():
+            self.assertEqual(getattr(analysis, name), value)
+    
+    def test_insufficient_data(self):
+        for consultations in ([], [{'symptoms': ['toux']}]):
+            with self.subTest(consultations=consultations):
+                self.assertMatchesBaseline(consultations)
+                self.assertFalse(self.analyzer.analyze_consultation_history(consultations).sufficient_data)
+    
+    def test_random_histories(self):
+        rng = random.Random(42)
+        for n_consultations in (2, 3, 5, 10, 40):
+            for timestamp_kind in ('datetime', 'str', 'mixed'):
+                for _ in range(20):
+                    consultations = random_history(rng, n_consultations, timestamp_kind)
+                    with self.subTest(n=n_consultations, kind=timestamp_kind):
+                        self.assertMatchesBaseline(consultations)
+    
+    def test_without_timestamps(self):
+        self.assertMatchesBaseline([{'symptoms': ['toux', 'fièvre']}, {'symptoms': ['toux']}])
+    
+    def test_calculate_disease_risk_accepts_analysis(self):
+        consultations = [
+            {'symptoms': ['fièvre', 'toux'], 'diagnosis': [{'disease': 'grippe'}],
+             'timestamp': (START + timedelta(days=i * 10)).isoformat()}
+            for i in range(4)
+        ]
+        analysis = self.analyzer.analyze_consultation_history(consultations)
+        risks = self.analyzer.calculate_disease_risk({'age': 65, 'lifestyle': 'sedentary'}, analysis)
+        self.assertEqual(risks[0]['disease'], 'grippe')
+        self.assertEqual(risks[0]['risk_level'], 'high')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Extraction des symptômes : l'automate Aho-Corasick et l'intersection de
+tokens doivent retrouver les mêmes symptômes que l'implémentation d'origine
+(re-tokenisation de chaque symptôme, test any(token in tokens)) ; détection
+d'urgence : même résultat que la recherche de sous-chaînes d'origine
+
+Lancer depuis backend/ : python -m unittest discover tests
+"""
+import os
+import re
+import sys
+import unittest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'models'))
+sys.path.insert(0, BACKEND_DIR)
+
+import app
+
+
+MESSAGES = (
+    "Bonjour",
+    "J'ai de la fièvre, de la toux et des courbatures depuis 2 jours, fatigue intense",
+    "mal de gorge intense et difficulté à avaler, fièvre 39",
+    "douleur thoracique et essoufflement sévère",
+    "J'ai des nausées, vomissements et diarrhée",
+    "yeux rouges, démangeaisons et éternuements, nez qui coule",
+    "mal de tête",
+    "FIÈVRE ET FRISSONS",
+    "fièvreux et fatigué",
+    "Vision troublée; sensibilité à la lumière",
+    "brûlures mictionnelles, envies fréquentes",
+    "éruption cutanée avec vésicules",
+    "crampes abdominales et maux de ventre",
+    "",
+)
+
+
+def _baseline_tokens(text):
+    """Tokenisation d'origine : ponctuation supprimée puis découpage"""
+    text = re.sub(r'[^\w\s]', '', text.lower())
+    return [token for token in text.split() if token not in app.analyzer.stop_words]
+
+
+def _baseline_extract_symptoms(text):
+    tokens = _baseline_tokens(text)
+    detected_symptoms = set()
+    for info in app.MEDICAL_KNOWLEDGE.values():
+        for symptom in info['symptoms']:
+            if any(token in tokens for token in _baseline_tokens(symptom)):
+                detected_symptoms.add(symptom)
+    return detected_symptoms
+
+
+class ExtractSymptomsTest(unittest.TestCase):
+    
+    def test_tokens_match_baseline(self):
+        for message in MESSAGES:
+            with self.subTest(message=message):
+                normalized = app.analyzer.normalize(message)
+                self.assertEqual(set(app.analyzer._extract_symptoms_by_tokens(normalized.token_set)),
+                                 _baseline_extract_symptoms(message))
+    
+    @unittest.skipIf(app.SYMPTOM_AUTOMATON is None, "pyahocorasick non installé")
+    def test_automaton_matches_baseline(self):
+        for message in MESSAGES:
+            with self.subTest(message=message):
+                symptoms = app.analyzer.extract_symptoms(app.analyzer.normalize(message))
+                self.assertEqual(len(symptoms), len(set(symptoms)))
+                self.assertEqual(set(symptoms), _baseline_extract_symptoms(message))
+    
+    @unittest.skipIf(app.SYMPTOM_AUTOMATON is None, "pyahocorasick non installé")
+    def test_automaton_matches_whole_words_only(self):
+        # "fièvreux" ne contient pas le mot "fièvre"
+        symptoms = app.analyzer.extract_symptoms(app.analyzer.normalize("fièvreux"))
+        self.assertNotIn("fièvre", symptoms)
+    
+    def test_punctuation_separates_words(self):
+        # Différence voulue avec l'origine, qui supprimait l'apostrophe et
+        # cherchait donc "loreille"
+        normalized = app.analyzer.normalize("j'ai mal à l'oreille")
+        self.assertIn("douleur oreille", app.analyzer._extract_symptoms_by_tokens(normalized.token_set))
+        if app.SYMPTOM_AUTOMATON is not None:
+            self.assertIn("douleur oreille", app.analyzer.extract_symptoms(normalized))
+
+
+# EMERGENCY_SYMPTOMS d'origine, avant dédoublonnage et tri par longueur
+BASELINE_EMERGENCY_SYMPTOMS = (
+    "douleur thoracique", "difficulté respiratoire", "perte de conscience",
+    "convulsions", "hémorragie", "paralysie", "confusion mentale",
+    "douleur abdominale sévère", "vomissement de sang", "paralysie faciale",
+    "trouble de la parole", "perte de sensibilité", "crise cardiaque",
+    "avc", "accident vasculaire", "saignement abondant", "essoufflement sévère"
+)
+
+EMERGENCY_MESSAGES = MESSAGES + (
+    "Douleur Thoracique depuis ce matin",
+    "il a fait un AVC hier",
+    "navcar",  # sous-chaîne "avc" : urgence, comme à l'origine
+    "paralysie faciale soudaine",
+    "douleur abdominale",
+    "douleur abdominale sévère et vomissement de sang",
+    "perte de sensibilité du bras gauche",
+)
+
+
+class CheckEmergencyTest(unittest.TestCase):
+    
+    def test_matches_baseline_substring_search(self):
+        for message in EMERGENCY_MESSAGES:
+            with self.subTest(message=message):
+                expected = any(emergency in message.lower() for emergency in BASELINE_EMERGENCY_SYMPTOMS)
+                self.assertEqual(app.analyzer.check_emergency(app.analyzer.normalize(message)), expected)
+    
+    def test_every_emergency_phrase_is_detected(self):
+        for emergency in BASELINE_EMERGENCY_SYMPTOMS:
+            with self.subTest(emergency=emergency):
+                message = app.analyzer.normalize(f"Depuis hier : {emergency.upper()}.")
+                self.assertTrue(app.analyzer.check_emergency(message))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
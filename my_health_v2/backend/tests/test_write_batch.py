@@ -0,0 +1,103 @@
+"""
+Écritures MongoDB différées : chaque document programmé par queue_write doit
+être inséré, dans l'ordre, comme avec les insert_one synchrones d'origine,
+y compris ceux encore en file à l'arrêt (_flush_writes, appelé par atexit)
+"""
+import os
+import sys
+import threading
+import unittest
+from queue import Queue
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'models'))
+sys.path.insert(0, BACKEND_DIR)
+
+import app
+
+
+class FakeCollection:
+    """Collection MongoDB minimale : nom et insert_many"""
+    
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+        self.documents = []
+        self.calls = 0
+    
+    def insert_many(self, documents, ordered=True):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("écriture refusée")
+        self.documents.extend(documents)
+
+
+class BatchWriterTest(unittest.TestCase):
+    
+    def setUp(self):
+        self._saved = (app._write_queue, app._write_thread)
+        app._write_queue = Queue()
+        app._write_thread = None
+    
+    def tearDown(self):
+        app._write_queue, app._write_thread = self._saved
+    
+    def _start_worker(self):
+        app._write_thread = threading.Thread(target=app._write_worker, daemon=True)
+        app._write_thread.start()
+    
+    def test_flush_on_exit_writes_every_queued_document(self):
+        conversations = FakeCollection('conversations')
+        consultations = FakeCollection('consultations')
+        expected = {'conversations': [], 'consultations': []}
+        
+        # Documents en file avant le démarrage du thread : rien n'est écrit
+        # avant l'arrêt, qui doit tout vider
+        for i in range(2 * app.WRITE_BATCH_SIZE + 7):
+            collection = conversations if i % 3 else consultations
+            document = {'user_id': 'u1', 'i': i}
+            app.queue_write(collection, document)
+            expected[collection.name].append(document)
+        self._start_worker()
+        app._flush_writes()
+        
+        self.assertFalse(app._write_thread.is_alive())
+        self.assertEqual(conversations.documents, expected['conversations'])
+        self.assertEqual(consultations.documents, expected['consultations'])
+    
+    def test_items_queued_behind_the_stop_marker_are_written(self):
+        conversations = FakeCollection('conversations')
+        app.queue_write(conversations, {'i': 0})
+        app._write_queue.put(None)
+        app.queue_write(conversations, {'i': 1})
+        self._start_worker()
+        app._write_thread.join(timeout=5)
+        
+        self.assertEqual(conversations.documents, [{'i': 0}, {'i': 1}])
+    
+    def test_batches_are_capped_and_grouped_by_collection(self):
+        conversations = FakeCollection('conversations')
+        for i in range(app.WRITE_BATCH_SIZE + 1):
+            app.queue_write(conversations, {'i': i})
+        self._start_worker()
+        app._flush_writes()
+        
+        self.assertEqual(conversations.calls, 2)
+        self.assertEqual([d['i'] for d in conversations.documents], list(range(app.WRITE_BATCH_SIZE + 1)))
+    
+    def test_failed_collection_does_not_block_the_others(self):
+        broken = FakeCollection('predictions', fail=True)
+        conversations = FakeCollection('conversations')
+        app.queue_write(broken, {'i': 0})
+        app.queue_write(conversations, {'i': 1})
+        self._start_worker()
+        app._flush_writes()
+        
+        self.assertEqual(conversations.documents, [{'i': 1}])
+    
+    def test_flush_without_worker_is_a_no_op(self):
+        app._flush_writes()
+
+
+if __name__ == '__main__':
+    unittest.main()
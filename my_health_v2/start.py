@@ -1,28 +1,54 @@
 import os
 import sys
 import time
-import webbrowser
-import subprocess
 from pathlib import Path
 
+# Ressources NLTK et leur chemin dans nltk_data ; le backend n'utilise plus
+# le tokenizer Punkt, seulement les stopwords
+RESOURCE_PATHS = {
+    'stopwords': 'corpora/stopwords',
+}
+
+# Écrit après une vérification réussie, avec la liste des ressources : les
+# démarrages suivants sautent la recherche dans les chemins NLTK (app.py
+# retélécharge de toute façon les stopwords s'ils ont disparu)
+NLTK_READY_SENTINEL = Path.home() / '.my_health_nltk_ready'
+
+# Adresse d'écoute du serveur Flask (app.run dans app.py), attendue avant
+# d'ouvrir le frontend ; au-delà du délai, le frontend est ouvert quand même
+BACKEND_ADDRESS = ('localhost', 5000)
+BACKEND_WAIT_TIMEOUT = 30
+BACKEND_POLL_INTERVAL = 0.05
 
 
 def check_nltk_data():
     """Télécharge les données NLTK si nécessaire"""
     print("\nVérification des ressources NLTK...")
     
-    import nltk
+    expected = '\n'.join(RESOURCE_PATHS)
+    try:
+        if NLTK_READY_SENTINEL.read_text() == expected:
+            print("✓ Ressources NLTK prêtes (déjà vérifiées)")
+            return
+    except OSError:
+        pass
     
-    resources = ['punkt', 'stopwords']
+    import nltk
     
-    for resource in resources:
+    for resource, path in RESOURCE_PATHS.items():
         try:
-            nltk.data.find(f'tokenizers/{resource}' if resource == 'punkt' else f'corpora/{resource}')
+            nltk.data.find(path)
             print(f"   OK: {resource}")
         except LookupError:
             print(f"   Téléchargement: {resource}")
-            nltk.download(resource, quiet=True)
+            if not nltk.download(resource, quiet=True):
+                print(f"   ATTENTION: échec du téléchargement de {resource}")
+                return
     
+    try:
+        NLTK_READY_SENTINEL.write_text(expected)
+    except OSError:
+        pass
     print("✓ Ressources NLTK prêtes")
 
 def check_env_file():
@@ -36,9 +62,7 @@ def check_env_file():
         if env_example.exists():
             print("   ATTENTION: Fichier .env manquant")
             print("   Création depuis .env.example...")
-            env_example.read_text()
-            with open('.env', 'w') as f:
-                f.write(env_example.read_text())
+            env_file.write_text(env_example.read_text())
             print("\n   IMPORTANT: Modifiez le fichier .env avec vos clés API")
             print("   - ANTHROPIC_API_KEY ou OPENAI_API_KEY")
             print("   - MONGO_URI (optionnel)")
@@ -73,12 +97,12 @@ def check_directories():
     
     directories = ['models', 'data', 'logs', 'frontend/css', 'frontend/js']
     
+    # mkdir seul : FileExistsError indique un dossier déjà présent
     for directory in directories:
-        path = Path(directory)
-        if not path.exists():
-            path.mkdir(parents=True, exist_ok=True)
+        try:
+            Path(directory).mkdir(parents=True)
             print(f"   Créé: {directory}")
-        else:
+        except FileExistsError:
             print(f"   OK: {directory}")
     
     print("Structure de dossiers prête")
@@ -94,7 +118,18 @@ def start_backend():
     if Path('backend').exists():
         os.chdir('backend')
     
-    # Lancer Flask
+    # Lancer Flask. Sous POSIX, le processus est remplacé par le serveur :
+    # pas d'interpréteur parent résident qui attend, Ctrl+C arrête app.py
+    if os.name == 'posix':
+        sys.stdout.flush()  # execv abandonne les tampons non écrits
+        sys.stderr.flush()
+        try:
+            os.execv(sys.executable, [sys.executable, 'app.py'])
+        except OSError as e:
+            print(f"\nErreur lors du démarrage: {e}")
+            sys.exit(1)
+    
+    import subprocess
     try:
         subprocess.run([sys.executable, 'app.py'], check=True)
     except KeyboardInterrupt:
@@ -103,13 +138,52 @@ def start_backend():
         print(f"\nErreur lors du démarrage: {e}")
         sys.exit(1)
 
+def launch_frontend_opener():
+    """
+    Ouvre le frontend depuis un processus séparé (start.py --open-frontend) :
+    un thread ne survivrait pas au os.execv de start_backend. Sous POSIX,
+    double fork : l'intermédiaire lance l'ouvreur puis se termine aussitôt
+    (attendu ici), l'ouvreur est rattaché à init qui le récupère ; le
+    serveur lancé par execv n'attend jamais ce fils, qui resterait zombie
+    """
+    import subprocess
+    command = [sys.executable, os.path.abspath(__file__), '--open-frontend']
+    if not hasattr(os, 'fork'):
+        subprocess.Popen(command)
+        return
+    
+    sys.stdout.flush()  # tampons non dupliqués dans l'intermédiaire
+    pid = os.fork()
+    if pid == 0:
+        try:
+            subprocess.Popen(command, start_new_session=True)
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+def wait_for_backend():
+    """Attend que le serveur accepte les connexions (au plus BACKEND_WAIT_TIMEOUT s)"""
+    import socket
+    deadline = time.monotonic() + BACKEND_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(BACKEND_ADDRESS, timeout=BACKEND_POLL_INTERVAL).close()
+            return True
+        except OSError:
+            time.sleep(BACKEND_POLL_INTERVAL)
+    return False
+
 def open_frontend():
-    """Ouvre le frontend dans le navigateur"""
-    time.sleep(2)  # Attendre que le serveur démarre
+    """Ouvre le frontend dans le navigateur, une fois le serveur joignable"""
+    if not wait_for_backend():
+        print(f"\n  Le serveur ne répond pas après {BACKEND_WAIT_TIMEOUT} s : frontend non ouvert.")
+        print("   Vérifiez les logs du backend, puis accédez manuellement à: http://localhost:5000/")
+        return
     
     frontend_path = Path('frontend/index.html')
     
     if frontend_path.exists():
+        import webbrowser
         url = f'file://{frontend_path.absolute()}'
         print(f"\n Ouverture du frontend: {url}")
         webbrowser.open(url)
@@ -126,14 +200,12 @@ def main():
         check_env_file()
         check_directories()
         
-        # Ouvrir le frontend dans un thread séparé
-        import threading
-        frontend_thread = threading.Thread(target=open_frontend, daemon=True)
-        frontend_thread.start()
+        # Ouvrir le frontend en parallèle du démarrage du serveur
+        launch_frontend_opener()
         
         # Lancer le backend (bloquant)
         start_backend()
-        
+    
     except KeyboardInterrupt:
         print("\n\n Arrêt de DiagnoX")
         sys.exit(0)
@@ -144,4 +216,7 @@ def main():
         sys.exit(1)
 
 if __name__ == '__main__':
-    main()
+    if '--open-frontend' in sys.argv[1:]:
+        open_frontend()
+    else:
+        main()